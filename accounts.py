@@ -0,0 +1,97 @@
+# accounts.py
+
+import os
+import json
+
+CONFIG_PATH = os.path.join("scheduler", "config.json")
+PAUSED_PATH = os.path.join("scheduler", "paused.json")
+
+MEDIA_EXTENSIONS = (".mp4", ".mov", ".jpg", ".jpeg", ".png")
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+
+# Subfolders of an account folder that set-aside files are moved to: re-uploads
+# of already posted media, and files Instagram keeps rejecting.
+DUPLICATES_FOLDER = os.getenv("DUPLICATES_FOLDER", "duplicates")
+FAILED_FOLDER = os.getenv("FAILED_FOLDER", "failed")
+
+# Anything that doesn't follow the naming convention in Account.__init__.
+ACCOUNT_OVERRIDES = {
+    "eclipsed_by_you": {
+        "folder": "/eclipsed.by.you",
+        "caption": "#eclipsed_by_you ✨\n#🎵 #🎶 #🎧 #aesthetic",
+        "share_to_feed": False,
+    },
+    "ink_wisps": {
+        "caption": "#ink_wisps ✨\n#relatable #reels ",
+    },
+    "inkwisps": {
+        "caption": "#inkwisps ✨\n#quotes #poetry #aesthetic",
+    },
+}
+
+
+class Account:
+    """One Instagram account, its Dropbox folder and the secrets that drive it.
+
+    Secret names follow the convention the bot already uses when it updates
+    them (IG_<NAME>_TOKEN, DROPBOX_<NAME>_APP_KEY, ...), so a new account only
+    needs a config.json entry and its secrets.
+    """
+
+    def __init__(self, name, folder=None, caption=None, share_to_feed=True, queue_policy=None):
+        self.name = name
+        self.folder = folder or f"/{name}"
+        self.caption = caption if caption is not None else f"#{name} ✨"
+        self.share_to_feed = share_to_feed
+        # None means media_queue.DEFAULT_POLICY (QUEUE_POLICY env var).
+        self.queue_policy = queue_policy
+
+        prefix = name.upper()
+        self.instagram_token_env = f"IG_{prefix}_TOKEN"
+        self.instagram_id_env = f"IG_{prefix}_ID"
+        self.dropbox_app_key_env = f"DROPBOX_{prefix}_APP_KEY"
+        self.dropbox_app_secret_env = f"DROPBOX_{prefix}_APP_SECRET"
+        self.dropbox_refresh_env = f"DROPBOX_{prefix}_REFRESH"
+        self.dropbox_token_secret = f"DROPBOX_{prefix}_TOKEN"
+
+    @property
+    def instagram_access_token(self):
+        return os.getenv(self.instagram_token_env)
+
+    @property
+    def instagram_account_id(self):
+        return os.getenv(self.instagram_id_env)
+
+    @property
+    def dropbox_app_key(self):
+        return os.getenv(self.dropbox_app_key_env)
+
+    @property
+    def dropbox_app_secret(self):
+        return os.getenv(self.dropbox_app_secret_env)
+
+    @property
+    def dropbox_refresh_token(self):
+        return os.getenv(self.dropbox_refresh_env)
+
+    def __repr__(self):
+        return f"Account({self.name!r})"
+
+
+def load_accounts(config_path=CONFIG_PATH):
+    """Build the registry from the top-level keys of scheduler/config.json."""
+    try:
+        with open(config_path, "r") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+
+    return {name: Account(name, **ACCOUNT_OVERRIDES.get(name, {})) for name in config}
+
+
+def load_paused(paused_path=PAUSED_PATH):
+    try:
+        with open(paused_path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
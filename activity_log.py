@@ -0,0 +1,131 @@
+# activity_log.py
+
+import os
+import io
+import gzip
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+LOG_DIR = "logs"
+ACTIVITY_LOG_PATH = os.path.join(LOG_DIR, "bot_activity.jsonl")
+ARCHIVE_DIR = os.path.join(LOG_DIR, "archive")
+# Rotate whichever comes first: the live file reaching this size...
+MAX_BYTES = int(os.getenv("ACTIVITY_LOG_MAX_BYTES", 512 * 1024))
+# ...or its first record being this old.
+MAX_AGE_SECONDS = int(os.getenv("ACTIVITY_LOG_MAX_AGE", 7 * 24 * 3600))
+# Compressed archives kept locally (the repo keeps every one that was pushed).
+KEEP_ARCHIVES = int(os.getenv("ACTIVITY_LOG_KEEP", 10))
+TAIL_BLOCK_SIZE = 8192
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLog:
+    """Append-only JSON Lines log with size/age rotation into gzip archives.
+
+    append() writes one line and never reads the file back. tail() seeks
+    backwards from the end, so viewing recent activity costs the same no
+    matter how long the log is. on_write, if set, is called with each path
+    that changed (the live file, or a new archive) so a batched uploader
+    can pick it up later.
+    """
+
+    def __init__(self, path=ACTIVITY_LOG_PATH, archive_dir=ARCHIVE_DIR, max_bytes=MAX_BYTES,
+                 max_age=MAX_AGE_SECONDS, keep=KEEP_ARCHIVES, on_write=None):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self.on_write = on_write
+        self._lock = threading.Lock()
+        self._started_at = None
+
+    def _first_timestamp(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                first = f.readline()
+            return datetime.fromisoformat(json.loads(first)["timestamp"])
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _should_rotate(self, now):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if size >= self.max_bytes:
+            return True
+        if self._started_at is None:
+            self._started_at = self._first_timestamp() or now
+        return (now - self._started_at).total_seconds() >= self.max_age
+
+    def _rotate(self, now):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(self.path))[0]
+        archive_path = os.path.join(self.archive_dir, f"{base}-{now:%Y%m%d-%H%M%S-%f}.jsonl.gz")
+        with open(self.path, "rb") as src, gzip.open(archive_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        # Truncate rather than delete so the live path always exists remotely.
+        open(self.path, "w").close()
+        self._started_at = None
+        logger.info(f"Rotated activity log into {archive_path}")
+
+        archives = sorted(
+            name for name in os.listdir(self.archive_dir)
+            if name.startswith(f"{base}-") and name.endswith(".jsonl.gz")
+        )
+        for name in archives[:-self.keep] if self.keep else []:
+            os.remove(os.path.join(self.archive_dir, name))
+        return archive_path
+
+    def append(self, record):
+        now = datetime.now()
+        record = {"timestamp": now.isoformat(), **record}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        changed = []
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self._should_rotate(now):
+                changed.append(self._rotate(now))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            if self._started_at is None:
+                self._started_at = now
+            changed.append(self.path)
+        if self.on_write:
+            for path in changed:
+                self.on_write(path)
+
+    def tail(self, n=10):
+        """Return the last n records, oldest first, reading only the end of the file."""
+        if n <= 0:
+            return []
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            f.seek(0, io.SEEK_END)
+            pos = f.tell()
+            data = b""
+            # n records need n newlines after the one that precedes the first of them.
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(TAIL_BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+
+        records = []
+        for raw in data.splitlines()[-n:]:
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                # A torn first line from the block boundary, or a partial write.
+                continue
+        return records[-n:]
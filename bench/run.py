@@ -0,0 +1,154 @@
+# bench/run.py
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+from pytz import timezone
+
+from bench.stubs import StandIns, StubConfig, POISONED_PREFIX
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCOUNT = "inkwisps"
+IST = timezone("Asia/Kolkata")
+
+
+def _scheduler_tree(workdir, slot):
+    """Write a scheduler/ tree with a single slot for ACCOUNT at `slot` (an IST datetime)."""
+    scheduler = os.path.join(workdir, "scheduler")
+    os.makedirs(scheduler, exist_ok=True)
+    config = {ACCOUNT: {slot.strftime("%A"): [slot.strftime("%H:%M")]}}
+    for name, data in {"config.json": config, "paused.json": {}, "captions.json": {},
+                       "token_expiry.json": {}, "post_results.json": {}, "banned.json": []}.items():
+        with open(os.path.join(scheduler, name), "w") as f:
+            json.dump(data, f)
+
+
+def _env(stand_ins):
+    prefix = ACCOUNT.upper()
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "HTTP_HOST_OVERRIDES": stand_ins.host_overrides(),
+        "TELEGRAM_BOT_TOKEN": "123456:bench",
+        "TELEGRAM_CHAT_ID": "1000",
+        "GITHUB_REPOSITORY": "bench/repo",
+        "GH_PAT": "bench",
+        f"IG_{prefix}_TOKEN": "bench-ig-token",
+        f"IG_{prefix}_ID": "17841400000000000",
+        f"DROPBOX_{prefix}_APP_KEY": "bench-key",
+        f"DROPBOX_{prefix}_APP_SECRET": "bench-secret",
+        f"DROPBOX_{prefix}_REFRESH": "bench-refresh",
+    })
+    return env
+
+
+def _seed(stand_ins, files, extension, poisoned=0):
+    # Poisoned files are seeded first, so they head the oldest-first queue.
+    for i in range(poisoned):
+        stand_ins.dropbox.add_file(f"/{ACCOUNT}/{POISONED_PREFIX}{i:05d}{extension}", size=2 * 1024 * 1024)
+    for i in range(files):
+        stand_ins.dropbox.add_file(f"/{ACCOUNT}/bench_{i:05d}{extension}", size=2 * 1024 * 1024)
+
+
+# name -> (child scenario, files to seed, extension, minutes from now to the slot)
+SCENARIOS = {
+    "noop_tick": ("tick", 0, ".jpg", 180),
+    "image_post": ("tick", 50, ".jpg", 0),
+    "reel_post": ("tick", 50, ".mp4", 0),
+    "status_tap": ("status_tap", None, ".jpg", 180),
+}
+
+
+def run_scenario(name, stand_ins, workdir, files, seed=True, poisoned=0):
+    child, seed_count, extension, slot_minutes = SCENARIOS[name]
+    stand_ins.recorder.reset()
+    if seed:
+        _seed(stand_ins, files if seed_count is None else seed_count, extension, poisoned)
+    _scheduler_tree(workdir, datetime.now(IST) + timedelta(minutes=slot_minutes))
+
+    started = time.monotonic()
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.scenarios", child],
+        cwd=workdir, env=_env(stand_ins), capture_output=True, text=True, timeout=900
+    )
+    wall = time.monotonic() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{proc.stderr[-2000:]}")
+    detail = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    published = stand_ins.recorder.first("published")
+    return {
+        "scenario": name,
+        "wall_s": round(wall, 3),
+        "detail": detail,
+        "time_to_publish_s": round(published["at"] - started, 3) if published else None,
+        "requests": sum(stand_ins.recorder.counts.values()),
+        "by_endpoint": dict(sorted(stand_ins.recorder.counts.items())),
+    }
+
+
+def _print_report(results, config):
+    print(f"latency={config.latency}s error_rate={config.error_rate} "
+          f"reels_processing={config.reels_processing_seconds}s graph_usage={config.graph_usage}%")
+    for r in results:
+        ttp = f"{r['time_to_publish_s']:.2f}s" if r["time_to_publish_s"] is not None else "-"
+        extra = ""
+        if "tap_s" in r["detail"]:
+            extra = "  taps: " + ", ".join(f"{t * 1000:.0f}ms" for t in r["detail"]["tap_s"])
+        print(f"\n{r['scenario']:<12} run {r['run']}  wall {r['wall_s']:.2f}s  "
+              f"import {r['detail'].get('import_s', 0):.2f}s  publish {ttp}  requests {r['requests']}{extra}")
+        for endpoint, count in r["by_endpoint"].items():
+            print(f"    {count:>6}  {endpoint}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the poster and bot against local stand-ins.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all).")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per scenario; later runs reuse the first run's .cache (a warm runner).")
+    parser.add_argument("--files", type=int, default=5000, help="Files queued for status_tap.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean seconds added to every request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503.")
+    parser.add_argument("--reels-seconds", type=float, default=5.0, help="Seconds a Reels container stays IN_PROGRESS.")
+    parser.add_argument("--graph-usage", type=float, default=5.0,
+                        help="Utilisation percent reported in Graph's usage headers.")
+    parser.add_argument("--poisoned", type=int, default=0,
+                        help="Files at the head of the queue whose container create always fails.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directories.")
+    args = parser.parse_args(argv)
+
+    config = StubConfig(latency=args.latency, error_rate=args.error_rate,
+                        reels_processing_seconds=args.reels_seconds, graph_usage=args.graph_usage, seed=args.seed)
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        # Fresh services and scratch tree per scenario; repeats share both.
+        stand_ins = StandIns(config).start()
+        workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+        try:
+            for run in range(1, args.repeat + 1):
+                result = run_scenario(name, stand_ins, workdir, args.files, seed=run == 1, poisoned=args.poisoned)
+                result["run"] = run
+                results.append(result)
+        finally:
+            stand_ins.stop()
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    _print_report(results, config)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
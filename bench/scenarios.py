@@ -0,0 +1,69 @@
+# bench/scenarios.py
+
+# Child side of the benchmark: one scenario per fresh interpreter, started by
+# bench/run.py with HTTP_HOST_OVERRIDES pointing at the stand-ins and the cwd
+# set to a scratch scheduler tree. Prints one JSON line of timings.
+
+import sys
+import json
+import time
+
+STARTED = time.monotonic()
+
+
+def run_tick():
+    from post_engine import run_due_accounts
+
+    imported = time.monotonic()
+    results = run_due_accounts()
+    return {"import_s": imported - STARTED, "run_s": time.monotonic() - imported, "results": results}
+
+
+def run_status_tap(account="inkwisps", taps=2):
+    from types import SimpleNamespace
+    from telegram import Bot, Update
+    import http_client
+    import telegram_bot_controller as controller
+
+    imported = time.monotonic()
+    bot = Bot("123456:bench", base_url=http_client.telegram_base_url())
+    context = SimpleNamespace(bot=bot, user_data={"account": account})
+    timings = []
+    for i in range(taps):
+        update = Update.de_json({
+            "update_id": i + 1,
+            "callback_query": {
+                "id": str(i + 1),
+                "from": {"id": 42, "is_bot": False, "first_name": "bench"},
+                "chat_instance": "bench",
+                "data": "status",
+                "message": {
+                    "message_id": 100 + i,
+                    "date": int(time.time()),
+                    "chat": {"id": 42, "type": "private"},
+                    "text": "Manage: inkwisps",
+                },
+            },
+        }, bot)
+        started = time.monotonic()
+        controller.handle_status(update, context)
+        timings.append(time.monotonic() - started)
+    return {"import_s": imported - STARTED, "tap_s": timings}
+
+
+SCENARIOS = {
+    "tick": run_tick,
+    "status_tap": run_status_tap,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    result = SCENARIOS[argv[0]]()
+    result["total_s"] = time.monotonic() - STARTED
+    print(json.dumps(result, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
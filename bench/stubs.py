@@ -0,0 +1,455 @@
+# bench/stubs.py
+
+import json
+import time
+import base64
+import random
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Real Dropbox pages list_folder results at roughly this many entries.
+DROPBOX_PAGE_SIZE = 2000
+# Files whose name starts with this are rejected by Graph's container create.
+POISONED_PREFIX = "poisoned_"
+
+
+class StubConfig:
+    """Knobs shared by every stand-in.
+
+    latency is the mean added delay per request in seconds (uniformly
+    jittered by +/- jitter), error_rate the fraction of requests answered
+    with a 5xx, and reels_processing_seconds how long a REELS container
+    reports IN_PROGRESS before FINISHED. graph_usage is the utilisation
+    percentage reported in Graph's X-App-Usage and X-Business-Use-Case-Usage
+    headers.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.25, error_rate=0.0, reels_processing_seconds=5.0,
+                 graph_usage=5.0, seed=None):
+        self.latency = latency
+        self.graph_usage = graph_usage
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reels_processing_seconds = reels_processing_seconds
+        self.random = random.Random(seed)
+
+
+class Recorder:
+    """Request counts per (service, endpoint) and timestamped events, shared by all stand-ins."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def hit(self, service, endpoint):
+        with self._lock:
+            self.counts[f"{service} {endpoint}"] += 1
+
+    def event(self, name, **data):
+        with self._lock:
+            self.events.append(dict(data, name=name, at=time.monotonic()))
+
+    def first(self, name):
+        return next((e for e in self.events if e["name"] == name), None)
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.events.clear()
+
+
+def _json(status, obj, headers=None):
+    return status, dict({"Content-Type": "application/json"}, **(headers or {})), json.dumps(obj).encode()
+
+
+def _listed(entry):
+    # Like Dropbox, which stopped filling media_info in listings in 2019 (include_media_info
+    # is ignored there); only get_metadata still returns it.
+    return {k: v for k, v in entry.items() if k != "media_info"}
+
+
+class DropboxStub:
+    """OAuth token endpoint plus the file routes the poster and controller use.
+
+    Files live in memory keyed by path_lower. Cursors encode the folder, the
+    page offset and the change sequence they were issued at, so
+    list_folder/continue returns real deltas after the first full listing.
+    """
+
+    name = "dropbox"
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.files = {}
+        self.changes = []
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._tokens = 0
+
+    def add_file(self, path, size=1024 * 1024, content=None, dimensions=(1080, 1350), duration=None):
+        """Add a file; dimensions (width, height) and duration (seconds) become its media info."""
+        path_display = path if path.startswith("/") else f"/{path}"
+        content = content if content is not None else path_display.encode()
+        name = path_display.rsplit("/", 1)[-1]
+        video = name.lower().endswith((".mp4", ".mov"))
+        if video and duration is None:
+            dimensions, duration = (1080, 1920), 15
+        media = {".tag": "video" if video else "photo",
+                 "dimensions": {"width": dimensions[0], "height": dimensions[1]}}
+        if video:
+            media["duration"] = int(duration * 1000)
+        with self._lock:
+            self.seq += 1
+            self.files[path_display.lower()] = {
+                ".tag": "file",
+                "name": name,
+                "id": f"id:{hashlib.md5(path_display.encode()).hexdigest()[:22]}",
+                "client_modified": "2024-01-01T00:00:00Z",
+                "server_modified": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1704067200 + self.seq)),
+                "rev": f"{self.seq:015x}",
+                "size": size,
+                "path_lower": path_display.lower(),
+                "path_display": path_display,
+                "content_hash": hashlib.sha256(content).hexdigest(),
+                "media_info": {".tag": "metadata", "metadata": media},
+            }
+            self.changes.append((self.seq, "add", path_display.lower()))
+
+    def remove_file(self, path_lower):
+        with self._lock:
+            entry = self.files.pop(path_lower, None)
+            if entry is None:
+                return None
+            self.seq += 1
+            self.changes.append((self.seq, "delete", path_lower))
+            return entry
+
+    def _under(self, folder, recursive, path_lower):
+        prefix = folder.rstrip("/").lower() + "/"
+        if not path_lower.startswith(prefix):
+            return False
+        return recursive or "/" not in path_lower[len(prefix):]
+
+    def _cursor(self, folder, recursive, offset, seq):
+        raw = json.dumps({"f": folder, "r": recursive, "o": offset, "s": seq})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def _page(self, folder, recursive, offset):
+        with self._lock:
+            listing = [e for p, e in sorted(self.files.items()) if self._under(folder, recursive, p)]
+            seq = self.seq
+        page = [_listed(e) for e in listing[offset:offset + DROPBOX_PAGE_SIZE]]
+        has_more = offset + DROPBOX_PAGE_SIZE < len(listing)
+        cursor = self._cursor(folder, recursive, offset + DROPBOX_PAGE_SIZE if has_more else None, seq)
+        return {"entries": page, "cursor": cursor, "has_more": has_more}
+
+    def _delta(self, folder, recursive, since):
+        with self._lock:
+            entries = []
+            for seq, kind, path in self.changes:
+                if seq <= since or not self._under(folder, recursive, path):
+                    continue
+                if kind == "delete":
+                    name = path.rsplit("/", 1)[-1]
+                    entries.append({".tag": "deleted", "name": name, "path_lower": path, "path_display": path})
+                elif path in self.files:
+                    entries.append(_listed(self.files[path]))
+            seq = self.seq
+        return {"entries": entries, "cursor": self._cursor(folder, recursive, None, seq), "has_more": False}
+
+    def handle(self, method, path, query, headers, body):
+        if path == "/oauth2/token":
+            self.recorder.hit(self.name, "POST /oauth2/token")
+            self._tokens += 1
+            return _json(200, {"access_token": f"sl.bench-{self._tokens}", "expires_in": 14400, "token_type": "bearer"})
+
+        args = json.loads(body or b"{}")
+        self.recorder.hit(self.name, f"POST {path}")
+        if path == "/2/files/list_folder":
+            return _json(200, self._page(args.get("path", ""), args.get("recursive", False), 0))
+        if path == "/2/files/list_folder/continue":
+            cursor = json.loads(base64.urlsafe_b64decode(args["cursor"]))
+            if cursor["o"] is not None:
+                return _json(200, self._page(cursor["f"], cursor["r"], cursor["o"]))
+            return _json(200, self._delta(cursor["f"], cursor["r"], cursor["s"]))
+        if path == "/2/files/get_temporary_link":
+            entry = self.files.get(args["path"].lower())
+            if entry is None:
+                return self._not_found()
+            return _json(200, {"metadata": entry, "link": f"https://dl.dropboxusercontent.com/bench{entry['path_lower']}"})
+        if path == "/2/files/get_metadata":
+            entry = self.files.get(args["path"].lower())
+            if entry and not args.get("include_media_info"):
+                entry = _listed(entry)
+            return _json(200, entry) if entry else self._not_found()
+        if path == "/2/files/move_batch_v2":
+            # Completes synchronously, as Dropbox does for small batches.
+            return _json(200, {".tag": "complete", "entries": [self._move(e) for e in args["entries"]]})
+        if path == "/2/files/delete_v2":
+            entry = self.remove_file(args["path"].lower())
+            if entry is None:
+                return self._not_found()
+            return _json(200, {"metadata": entry})
+        return _json(404, {"error_summary": f"unknown route {path}"})
+
+    def _move(self, relocation):
+        entry = self.remove_file(relocation["from_path"].lower())
+        if entry is None:
+            return {".tag": "failure", "failure": {".tag": "from_lookup", "from_lookup": {".tag": "not_found"}}}
+        self.add_file(relocation["to_path"], size=entry["size"])
+        moved = self.files[relocation["to_path"].lower()]
+        moved.update(content_hash=entry["content_hash"], media_info=entry["media_info"])
+        return {".tag": "success", "success": moved}
+
+    def _not_found(self):
+        return _json(409, {
+            "error_summary": "path_lookup/not_found/",
+            "error": {".tag": "path_lookup", "path_lookup": {".tag": "not_found"}},
+        })
+
+
+class GraphStub:
+    """Container create, status and publish on graph.facebook.com/v18.0."""
+
+    name = "graph"
+
+    def __init__(self, recorder, config):
+        self.recorder = recorder
+        self.config = config
+        self.containers = {}
+        self.published = set()
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return str(17840000000000000 + self._ids)
+
+    def _usage_headers(self):
+        usage = self.config.graph_usage
+        buc = {"call_count": usage, "total_cputime": usage / 2, "total_time": usage / 2, "type": "instagram",
+               "estimated_time_to_regain_access": 0 if usage < 100 else 30}
+        return {
+            "X-App-Usage": json.dumps({"call_count": usage / 2, "total_cputime": usage / 4, "total_time": usage / 4}),
+            "X-Business-Use-Case-Usage": json.dumps({"17841400000000000": [buc]}),
+        }
+
+    def handle(self, method, path, query, headers, body):
+        status, response_headers, payload = self._route(method, path, body)
+        response_headers.update(self._usage_headers())
+        return status, response_headers, payload
+
+    def _route(self, method, path, body):
+        parts = path.strip("/").split("/")[1:]  # drop the API version
+        form = {k: v[0] for k, v in parse_qs((body or b"").decode()).items()}
+        if method == "POST" and len(parts) == 2 and parts[1] == "media":
+            self.recorder.hit(self.name, "POST /{ig-user}/media")
+            if POISONED_PREFIX in form.get("image_url", form.get("video_url", "")):
+                return _json(400, {"error": {"message": "The aspect ratio is not supported.", "code": 36003}})
+            creation_id = self._next_id()
+            self.containers[creation_id] = (time.monotonic(), form.get("media_type", "IMAGE"))
+            self.recorder.event("container_created", id=creation_id)
+            return _json(200, {"id": creation_id})
+        if method == "POST" and len(parts) == 2 and parts[1] == "media_publish":
+            self.recorder.hit(self.name, "POST /{ig-user}/media_publish")
+            if form.get("creation_id") not in self.containers:
+                return _json(400, {"error": {"message": "Invalid creation_id", "code": 100}})
+            self.published.add(form["creation_id"])
+            self.recorder.event("published", creation_id=form["creation_id"])
+            return _json(200, {"id": self._next_id()})
+        if method == "GET" and len(parts) == 1:
+            self.recorder.hit(self.name, "GET /{container}?fields=status_code")
+            container = self.containers.get(parts[0])
+            if container is None:
+                return _json(400, {"error": {"message": "Unknown container", "code": 100}})
+            created, media_type = container
+            done = media_type != "REELS" or time.monotonic() - created >= self.config.reels_processing_seconds
+            status = "PUBLISHED" if parts[0] in self.published else "FINISHED" if done else "IN_PROGRESS"
+            return _json(200, {"status_code": status, "id": parts[0]})
+        return _json(404, {"error": {"message": f"unknown route {method} {path}", "code": 404}})
+
+
+class GitHubStub:
+    """Actions secrets and the Git Data endpoints used by github_sync."""
+
+    name = "github"
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.secrets = {}
+        self.head = "0" * 40
+        self.commits = {self.head: {"tree": {"sha": "1" * 40}}}
+        self._ids = 0
+        self._lock = threading.Lock()
+        try:
+            from nacl.public import PrivateKey
+            public_key = bytes(PrivateKey.generate().public_key)
+        except ImportError:
+            public_key = bytes(32)
+        self.public_key = {"key_id": "bench-key", "key": base64.b64encode(public_key).decode()}
+
+    def _sha(self):
+        with self._lock:
+            self._ids += 1
+            return hashlib.sha1(str(self._ids).encode()).hexdigest()
+
+    def handle(self, method, path, query, headers, body):
+        parts = path.strip("/").split("/")
+        # /repos/{owner}/{repo}/...
+        rest = "/".join(parts[3:])
+        args = json.loads(body) if body else {}
+        if rest == "actions/secrets/public-key":
+            self.recorder.hit(self.name, "GET actions/secrets/public-key")
+            if headers.get("If-None-Match") == '"bench-key"':
+                return 304, {"ETag": '"bench-key"'}, b""
+            return _json(200, self.public_key, {"ETag": '"bench-key"'})
+        if rest.startswith("actions/secrets/") and method == "PUT":
+            self.recorder.hit(self.name, "PUT actions/secrets/{name}")
+            self.secrets[parts[-1]] = args.get("encrypted_value")
+            return 201, {}, b""
+        if rest.startswith("git/ref/heads/") and method == "GET":
+            self.recorder.hit(self.name, "GET git/ref")
+            return _json(200, {"object": {"sha": self.head}})
+        if rest.startswith("git/commits/") and method == "GET":
+            self.recorder.hit(self.name, "GET git/commits/{sha}")
+            return _json(200, self.commits.get(parts[-1], {"tree": {"sha": "1" * 40}}))
+        if rest in ("git/blobs", "git/trees") and method == "POST":
+            self.recorder.hit(self.name, f"POST {rest}")
+            return _json(201, {"sha": self._sha()})
+        if rest == "git/commits" and method == "POST":
+            self.recorder.hit(self.name, "POST git/commits")
+            sha = self._sha()
+            self.commits[sha] = {"tree": {"sha": args.get("tree")}}
+            return _json(201, {"sha": sha})
+        if rest.startswith("git/refs/heads/") and method == "PATCH":
+            self.recorder.hit(self.name, "PATCH git/refs")
+            self.head = args["sha"]
+            self.recorder.event("git_commit", sha=self.head)
+            return _json(200, {"object": {"sha": self.head}})
+        return _json(404, {"message": f"unknown route {method} {path}"})
+
+
+class TelegramStub:
+    """Bot API methods the poster and controller call; every message is accepted."""
+
+    name = "telegram"
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.sent = []
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _message(self, chat_id, text):
+        with self._lock:
+            self._ids += 1
+            message_id = self._ids
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "bench"},
+            "text": text,
+        }
+
+    def handle(self, method, path, query, headers, body):
+        bot_method = path.rsplit("/", 1)[-1]
+        self.recorder.hit(self.name, bot_method)
+        if "json" in headers.get("Content-Type", ""):
+            args = json.loads(body or b"{}")
+        else:
+            args = {k: v[0] for k, v in parse_qs((body or b"").decode()).items()}
+
+        if bot_method in ("sendMessage", "editMessageText"):
+            message = self._message(args.get("chat_id", 1), args.get("text", ""))
+            if args.get("message_id"):
+                message["message_id"] = int(args["message_id"])
+            self.sent.append(message)
+            self.recorder.event(bot_method, text=args.get("text", ""))
+            return _json(200, {"ok": True, "result": message})
+        if bot_method == "getMe":
+            return _json(200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}})
+        if bot_method in ("answerCallbackQuery", "deleteMessage", "sendChatAction"):
+            return _json(200, {"ok": True, "result": True})
+        if bot_method == "getUpdates":
+            return _json(200, {"ok": True, "result": []})
+        return _json(404, {"ok": False, "error_code": 404, "description": f"Not Found: {bot_method}"})
+
+
+def _handler_for(service, config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            url = urlsplit(self.path)
+
+            if config.latency:
+                time.sleep(max(config.latency * config.random.uniform(1 - config.jitter, 1 + config.jitter), 0))
+            if config.error_rate and config.random.random() < config.error_rate:
+                service.recorder.hit(service.name, "injected 5xx")
+                status, headers, payload = _json(503, {"error": {"message": "injected failure", "code": 2}})
+            else:
+                status, headers, payload = service.handle(self.command, url.path, parse_qs(url.query), self.headers, body)
+
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StandIns:
+    """Runs the four stand-ins on loopback ports and maps the real hosts onto them."""
+
+    def __init__(self, config=None):
+        self.config = config or StubConfig()
+        self.recorder = Recorder()
+        self.dropbox = DropboxStub(self.recorder)
+        self.graph = GraphStub(self.recorder, self.config)
+        self.github = GitHubStub(self.recorder)
+        self.telegram = TelegramStub(self.recorder)
+        self._servers = {}
+
+    def start(self):
+        for service in (self.dropbox, self.graph, self.github, self.telegram):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(service, self.config))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name=f"stub-{service.name}", daemon=True).start()
+            self._servers[service.name] = server
+        return self
+
+    def url(self, name):
+        host, port = self._servers[name].server_address[:2]
+        return f"http://{host}:{port}"
+
+    def host_overrides(self):
+        """Value for HTTP_HOST_OVERRIDES covering every host the code talks to."""
+        hosts = {
+            "api.dropbox.com": "dropbox",
+            "api.dropboxapi.com": "dropbox",
+            "content.dropboxapi.com": "dropbox",
+            "graph.facebook.com": "graph",
+            "api.github.com": "github",
+            "api.telegram.org": "telegram",
+        }
+        return ",".join(f"{host}={self.url(name)}" for host, name in hosts.items())
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
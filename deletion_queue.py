@@ -0,0 +1,123 @@
+# deletion_queue.py
+
+import os
+import json
+import time
+import heapq
+import logging
+import threading
+
+PENDING_DELETIONS_PATH = os.path.join("scheduler", "pending_deletions.json")
+# A transient failure is retried on a later sweep, this long afterwards.
+RETRY_DELAY_SECONDS = 120
+# Telegram refuses to delete bot messages older than 48 hours; give up on them.
+MAX_MESSAGE_AGE_SECONDS = 48 * 3600
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionQueue:
+    """Persisted due-queue of (chat_id, message_id) pairs to delete later.
+
+    One heap ordered by due time, mirrored to a small JSON file so pending
+    deletions survive the bot being restarted (or killed) between runs.
+    changed tells whether the file was rewritten since it was loaded.
+    A periodic sweep pops everything that is due; nothing sleeps per
+    message. Rescheduling a message replaces its earlier entry lazily.
+    """
+
+    def __init__(self, path=PENDING_DELETIONS_PATH, on_save=None):
+        self.path = path
+        self.on_save = on_save
+        self._heap = []
+        self._due = {}
+        self.changed = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable deletion queue {self.path}: {e}")
+            return
+        for item in items:
+            key = (item["chat_id"], item["message_id"])
+            self._due[key] = (item["due"], item.get("sent", item["due"]))
+        self._heap = [(due, chat_id, message_id) for (chat_id, message_id), (due, _) in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def _save(self):
+        items = [
+            {"chat_id": chat_id, "message_id": message_id, "due": due, "sent": sent}
+            for (chat_id, message_id), (due, sent) in sorted(self._due.items(), key=lambda kv: kv[1])
+        ]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(items, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Could not write deletion queue {self.path}: {e}")
+            return
+        self.changed = True
+        if self.on_save:
+            self.on_save(self.path)
+
+    def schedule(self, chat_id, message_id, delay):
+        now = int(time.time())
+        due = now + int(delay)
+        key = (chat_id, message_id)
+        with self._lock:
+            sent = self._due.get(key, (None, now))[1]
+            self._due[key] = (due, sent)
+            heapq.heappush(self._heap, (due, chat_id, message_id))
+            self._save()
+
+    def pop_due(self, now=None):
+        """Remove and return every (chat_id, message_id) due by now."""
+        now = time.time() if now is None else now
+        due_items = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, chat_id, message_id = heapq.heappop(self._heap)
+                entry = self._due.get((chat_id, message_id))
+                if entry is None or entry[0] != due:
+                    continue  # superseded by a later schedule() for the same message
+                del self._due[(chat_id, message_id)]
+                due_items.append((chat_id, message_id, entry[1]))
+            if due_items:
+                self._save()
+        return due_items
+
+    def sweep(self, delete):
+        """Delete everything due with delete(chat_id, message_id); returns how many were removed.
+
+        delete() should return True when done or pointless to retry (e.g. the
+        message is already gone) and False on a transient failure.
+        """
+        now = time.time()
+        removed = 0
+        retry = []
+        for chat_id, message_id, sent in self.pop_due(now):
+            if now - sent > MAX_MESSAGE_AGE_SECONDS:
+                continue
+            if delete(chat_id, message_id):
+                removed += 1
+            else:
+                retry.append((chat_id, message_id, sent))
+        if retry:
+            with self._lock:
+                for chat_id, message_id, sent in retry:
+                    due = int(now) + RETRY_DELAY_SECONDS
+                    self._due[(chat_id, message_id)] = (due, sent)
+                    heapq.heappush(self._heap, (due, chat_id, message_id))
+                self._save()
+        return removed
+
+    def __len__(self):
+        return len(self._due)
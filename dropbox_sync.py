@@ -0,0 +1,222 @@
+# dropbox_sync.py
+
+import os
+import json
+import time
+import logging
+import threading
+from types import SimpleNamespace
+
+# Set DROPBOX_SYNC_DIR="" to keep manifests in memory only.
+SYNC_STATE_DIR = os.getenv("DROPBOX_SYNC_DIR", os.path.join(".cache", "dropbox_sync"))
+# Batch moves of a handful of files finish within a few seconds.
+MOVE_CHECK_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_from_metadata(md):
+    return {
+        "id": md.id,
+        "name": md.name,
+        "path_lower": md.path_lower,
+        "path_display": md.path_display,
+        "size": md.size,
+        "content_hash": md.content_hash,
+        "server_modified": md.server_modified.isoformat() if md.server_modified else None,
+    }
+
+
+class FolderSync:
+    """Local manifest of one Dropbox folder, kept current with list_folder cursors.
+
+    The first sync pages through the whole folder; every later sync only
+    applies the changes since the stored cursor, so listing cost follows what
+    changed rather than how many files are queued. last_changes holds what the
+    latest sync applied, or None after a full listing, and since the cursor it
+    started from; a consumer that keeps its own copy of the cursor can tell
+    whether it saw every delta up to there.
+    """
+
+    def __init__(self, dbx, account, folder, recursive=False, state_dir=SYNC_STATE_DIR):
+        self.dbx = dbx
+        self.account = account
+        self.folder = folder
+        self.recursive = recursive
+        suffix = "_recursive" if recursive else ""
+        self.path = os.path.join(state_dir, f"{account}{suffix}.json") if state_dir else None
+        self.cursor = None
+        self.entries = {}
+        self.last_changes = None
+        self.since = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        # A manifest for a different folder is useless; start over.
+        if state.get("folder") == self.folder and state.get("recursive") == self.recursive:
+            self.cursor = state.get("cursor")
+            self.entries = state.get("entries", {})
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "folder": self.folder,
+                    "recursive": self.recursive,
+                    "cursor": self.cursor,
+                    "entries": self.entries,
+                }, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write manifest {self.path}: {e}")
+
+    def _apply(self, result, changes=None):
+        """Apply one page; with changes=(upserted, removed), also record what it touched."""
+        import dropbox
+
+        for md in result.entries:
+            if isinstance(md, dropbox.files.FileMetadata):
+                entry = self.entries[md.path_lower] = _entry_from_metadata(md)
+                if changes is not None:
+                    changes[0][md.path_lower] = entry
+                    changes[1].discard(md.path_lower)
+            elif isinstance(md, dropbox.files.DeletedMetadata):
+                removed = [md.path_lower] if md.path_lower in self.entries else []
+                if self.recursive:
+                    # A deleted folder takes everything under it along.
+                    prefix = md.path_lower + "/"
+                    removed += [p for p in self.entries if p.startswith(prefix)]
+                for path in removed:
+                    del self.entries[path]
+                if changes is not None:
+                    for path in removed:
+                        changes[0].pop(path, None)
+                        changes[1].add(path)
+
+    def _full_listing(self):
+        self.entries = {}
+        result = self.dbx.files_list_folder(self.folder, recursive=self.recursive)
+        self._apply(result)
+        while result.has_more:
+            result = self.dbx.files_list_folder_continue(result.cursor)
+            self._apply(result)
+        return result.cursor
+
+    def sync(self):
+        """Bring the manifest up to date and return it as {path_lower: entry}."""
+        import dropbox
+
+        with self._lock:
+            self.since = self.cursor
+            if self.cursor:
+                try:
+                    changes = ({}, set())
+                    result = self.dbx.files_list_folder_continue(self.cursor)
+                    self._apply(result, changes)
+                    while result.has_more:
+                        result = self.dbx.files_list_folder_continue(result.cursor)
+                        self._apply(result, changes)
+                    self.last_changes = changes
+                    if not (changes[0] or changes[1]):
+                        # Nothing new; the stored (older) cursor is still valid,
+                        # so keep it and skip rewriting the whole manifest.
+                        return self.entries
+                    self.cursor = result.cursor
+                except dropbox.exceptions.ApiError as e:
+                    if not (hasattr(e.error, "is_reset") and e.error.is_reset()):
+                        raise
+                    logger.info(f"Cursor for {self.folder} was reset; relisting")
+                    self.since = None
+                    self.cursor = self._full_listing()
+                    self.last_changes = None
+            else:
+                self.cursor = self._full_listing()
+                self.last_changes = None
+            self._save()
+            return self.entries
+
+    def remove(self, path_lower):
+        """Drop a file we deleted ourselves without waiting for the next delta."""
+        with self._lock:
+            if self.entries.pop(path_lower, None) is not None:
+                self._save()
+
+    def move_to(self, paths, subfolder):
+        """Move paths into folder/subfolder with one batch call; returns the paths that moved.
+
+        Moved files are dropped from the manifest straight away; anything
+        still in flight after MOVE_CHECK_ATTEMPTS checks is left for the next
+        sync's delta to settle.
+        """
+        from dropbox.files import RelocationPath
+
+        paths = list(paths)
+        if not paths:
+            return []
+        target = f"{self.folder.rstrip('/')}/{subfolder}"
+        launch = self.dbx.files_move_batch_v2(
+            [RelocationPath(path, f"{target}/{self.entries.get(path, {}).get('name') or path.rsplit('/', 1)[-1]}")
+             for path in paths],
+            autorename=True
+        )
+        if launch.is_complete():
+            result = launch.get_complete()
+        else:
+            job_id = launch.get_async_job_id()
+            result = None
+            for attempt in range(MOVE_CHECK_ATTEMPTS):
+                time.sleep(0.5 * (attempt + 1))
+                status = self.dbx.files_move_batch_check_v2(job_id)
+                if status.is_complete():
+                    result = status.get_complete()
+                    break
+            if result is None:
+                logger.warning(f"Batch move to {target} still running; the next sync will pick it up")
+                return []
+
+        moved = [path for path, entry in zip(paths, result.entries) if entry.is_success()]
+        with self._lock:
+            for path in moved:
+                self.entries.pop(path, None)
+            if moved:
+                self._save()
+        return moved
+
+    def files(self, extensions=None):
+        entries = self.entries.values()
+        if extensions:
+            entries = [e for e in entries if e["name"].lower().endswith(extensions)]
+        return [SimpleNamespace(**e) for e in entries]
+
+    def count(self):
+        return len(self.entries)
+
+
+_syncs = {}
+_syncs_lock = threading.Lock()
+
+
+def get_folder_sync(dbx, account, folder, recursive=False):
+    """One FolderSync per folder per process, pointed at the caller's current client."""
+    key = (account, folder, recursive)
+    with _syncs_lock:
+        sync = _syncs.get(key)
+        if sync is None:
+            sync = _syncs[key] = FolderSync(dbx, account, folder, recursive)
+        sync.dbx = dbx
+        return sync
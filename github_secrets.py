@@ -0,0 +1,179 @@
+# github_secrets.py
+
+import os
+import hmac
+import json
+import hashlib
+import logging
+import threading
+import http_client
+from concurrent.futures import ThreadPoolExecutor
+
+GITHUB_API_BASE = "https://api.github.com"
+
+# Set GITHUB_SECRETS_CACHE="" to keep the public key in memory only.
+SECRETS_CACHE_PATH = os.getenv("GITHUB_SECRETS_CACHE", os.path.join(".cache", "github_secrets.json"))
+MAX_CONCURRENT_UPDATES = 4
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubSecrets:
+    """Writes Actions secrets for one repo without redundant API calls.
+
+    The repo public key is cached and revalidated with its ETag (a 304 costs
+    no rate limit), and a keyed digest of every value this process wrote is
+    kept so an unchanged secret is not sealed or PUT again. The digests are
+    never persisted: a secret edited in the GitHub UI or by another workflow
+    would otherwise look unchanged to every later run.
+    """
+
+    def __init__(self, repo, token, cache_path=SECRETS_CACHE_PATH):
+        self.repo = repo
+        self.token = token
+        self.cache_path = cache_path
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json"
+        }
+        self._lock = threading.Lock()
+        self._cache = self._load()
+        self._digests = {}
+        self._key_validated = False
+
+    def _load(self):
+        if self.cache_path:
+            try:
+                with open(self.cache_path, "r") as f:
+                    cache = json.load(f)
+                if cache.get("repo") == self.repo:
+                    # Older caches persisted digests; they are process-local now.
+                    cache.pop("digests", None)
+                    return cache
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable secrets cache {self.cache_path}: {e}")
+        return {"repo": self.repo, "public_key": None}
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write secrets cache {self.cache_path}: {e}")
+
+    def _digest(self, name, value):
+        # Keyed with the PAT so a digest reveals nothing about the value.
+        return hmac.new((self.token or "").encode(), f"{name}\0{value}".encode(), hashlib.sha256).hexdigest()
+
+    def public_key(self, refresh=False):
+        """Return (key_id, key), revalidating the cached copy with If-None-Match."""
+        with self._lock:
+            cached = self._cache.get("public_key")
+            if cached and self._key_validated and not refresh:
+                return cached["key_id"], cached["key"]
+
+            headers = dict(self.headers)
+            if cached and cached.get("etag") and not refresh:
+                headers["If-None-Match"] = cached["etag"]
+
+            res = http_client.get(f"{GITHUB_API_BASE}/repos/{self.repo}/actions/secrets/public-key", headers=headers)
+            if res.status_code == 304 and cached:
+                self._key_validated = True
+                return cached["key_id"], cached["key"]
+            if res.status_code != 200:
+                raise Exception(f"Failed to get public key: {res.text}")
+
+            key_data = res.json()
+            if not key_data.get("key_id") or not key_data.get("key"):
+                raise Exception("GitHub public key missing")
+
+            if not cached or cached.get("key_id") != key_data["key_id"]:
+                # A rotated key means previously written values must be resealed.
+                self._digests = {}
+            self._cache["public_key"] = {
+                "key_id": key_data["key_id"],
+                "key": key_data["key"],
+                "etag": res.headers.get("ETag"),
+            }
+            self._save()
+            self._key_validated = True
+            return key_data["key_id"], key_data["key"]
+
+    def update(self, name, value):
+        """Seal and PUT one secret; returns True if GitHub has the value afterwards."""
+        digest = self._digest(name, value)
+        with self._lock:
+            if self._digests.get(name) == digest:
+                logger.info(f"Secret {name} unchanged, skipping update")
+                return True
+
+        res = self._put(name, value, self.public_key())
+        if res.status_code == 422:
+            # Stale key_id (the repo key was rotated): refetch once and reseal.
+            res = self._put(name, value, self.public_key(refresh=True))
+        if res.status_code not in [201, 204]:
+            raise Exception(f"Failed to update secret {name}: {res.text}")
+
+        with self._lock:
+            self._digests[name] = digest
+        logger.info(f"Successfully updated secret {name}")
+        return True
+
+    def _put(self, name, value, key):
+        from nacl import encoding, public
+
+        key_id, key = key
+        pub_key = public.PublicKey(key.encode(), encoding.Base64Encoder())
+        sealed = public.SealedBox(pub_key).encrypt(value.encode())
+        encrypted_value = encoding.Base64Encoder().encode(sealed).decode()
+
+        return http_client.put(
+            f"{GITHUB_API_BASE}/repos/{self.repo}/actions/secrets/{name}",
+            headers=self.headers,
+            json={"encrypted_value": encrypted_value, "key_id": key_id}
+        )
+
+    def update_many(self, secrets):
+        """Write several secrets concurrently; returns {name: success}."""
+        if not secrets:
+            return {}
+
+        def _update(item):
+            name, value = item
+            try:
+                return name, self.update(name, value)
+            except Exception as e:
+                logger.error(f"GitHub secret update failed for {name}: {e}")
+                return name, False
+
+        # Fetch (or revalidate) the key once up front instead of once per thread.
+        try:
+            self.public_key()
+        except Exception as e:
+            logger.error(f"GitHub secret update failed: {e}")
+            return {name: False for name in secrets}
+        workers = min(MAX_CONCURRENT_UPDATES, len(secrets))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(_update, secrets.items()))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_github_secrets(repo=None, token=None):
+    """Shared client per repo/token, built from GITHUB_REPOSITORY and GH_PAT by default."""
+    repo = repo or os.getenv("GITHUB_REPOSITORY")
+    token = token or os.getenv("GH_PAT")
+    with _clients_lock:
+        client = _clients.get((repo, token))
+        if client is None:
+            client = _clients[(repo, token)] = GitHubSecrets(repo, token)
+        return client
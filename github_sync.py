@@ -0,0 +1,184 @@
+# github_sync.py
+
+import os
+import time
+import base64
+import atexit
+import hashlib
+import logging
+import threading
+
+import http_client
+
+GITHUB_API_BASE = "https://api.github.com"
+SYNC_BRANCH = os.getenv("GITHUB_SYNC_BRANCH", "main")
+# Wait this long after the last change before pushing...
+DEBOUNCE_SECONDS = float(os.getenv("GITHUB_SYNC_DEBOUNCE", 5))
+# ...but never hold a change back for longer than this.
+MAX_DELAY_SECONDS = float(os.getenv("GITHUB_SYNC_MAX_DELAY", 30))
+MAX_ATTEMPTS = 4
+# Activity logs change on every bot reply; push them far less eagerly.
+LOG_DEBOUNCE_SECONDS = float(os.getenv("ACTIVITY_SYNC_DEBOUNCE", 60))
+LOG_MAX_DELAY_SECONDS = float(os.getenv("ACTIVITY_SYNC_MAX_DELAY", 600))
+
+logger = logging.getLogger(__name__)
+
+
+def _git_blob_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class WriteBehindSync:
+    """Coalesces local file writes into one commit per burst via the Git Data API.
+
+    Callers write the file locally and call mark_dirty(). After a quiet period
+    every dirty file is committed together (ref -> tree -> commit -> ref
+    update). If the branch moved underneath us the same file contents are
+    reapplied on the new head and the update retried.
+    """
+
+    def __init__(self, repo, token, branch=SYNC_BRANCH, debounce=DEBOUNCE_SECONDS,
+                 max_delay=MAX_DELAY_SECONDS, source="Telegram bot"):
+        self.repo = repo
+        self.branch = branch
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.source = source
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github+json"
+        }
+        self._dirty = set()
+        self._first_dirty_at = None
+        self._pushed = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def _api(self, path):
+        return f"{GITHUB_API_BASE}/repos/{self.repo}/git/{path}"
+
+    def mark_dirty(self, path):
+        """Schedule a repo-relative path for the next coalesced commit."""
+        with self._lock:
+            self._dirty.add(path)
+            now = time.monotonic()
+            if self._first_dirty_at is None:
+                self._first_dirty_at = now
+            delay = min(self.debounce, max(self._first_dirty_at + self.max_delay - now, 0))
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _read_changed(self, paths):
+        files = {}
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                logger.warning(f"Skipping {path}: file no longer exists")
+                continue
+            if self._pushed.get(path) != _git_blob_sha(content):
+                files[path] = content
+        return files
+
+    def _tree_entry(self, path, content):
+        try:
+            return {"path": path, "mode": "100644", "type": "blob", "content": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            # Binary files (e.g. gzip log archives) need an explicit base64 blob.
+            blob = http_client.post(self._api("blobs"), idempotent=True, headers=self.headers, json={
+                "content": base64.b64encode(content).decode("ascii"),
+                "encoding": "base64",
+            })
+            blob.raise_for_status()
+            return {"path": path, "mode": "100644", "type": "blob", "sha": blob.json()["sha"]}
+
+    def _commit(self, files):
+        ref = http_client.get(self._api(f"ref/heads/{self.branch}"), headers=self.headers)
+        ref.raise_for_status()
+        head_sha = ref.json()["object"]["sha"]
+
+        head = http_client.get(self._api(f"commits/{head_sha}"), headers=self.headers)
+        head.raise_for_status()
+
+        tree = http_client.post(self._api("trees"), idempotent=True, headers=self.headers, json={
+            "base_tree": head.json()["tree"]["sha"],
+            "tree": [self._tree_entry(path, content) for path, content in sorted(files.items())],
+        })
+        tree.raise_for_status()
+
+        commit = http_client.post(self._api("commits"), idempotent=True, headers=self.headers, json={
+            "message": f"Update {', '.join(sorted(files))} via {self.source}",
+            "tree": tree.json()["sha"],
+            "parents": [head_sha],
+        })
+        commit.raise_for_status()
+
+        # force=False: GitHub rejects the update with 422 if the branch moved.
+        update = http_client.patch(self._api(f"refs/heads/{self.branch}"), headers=self.headers, json={
+            "sha": commit.json()["sha"],
+            "force": False,
+        })
+        if update.status_code == 422:
+            return False
+        update.raise_for_status()
+        return True
+
+    def flush(self):
+        """Push every dirty file in one commit; returns True when nothing is left pending."""
+        with self._flush_lock:
+            with self._lock:
+                paths, self._dirty = self._dirty, set()
+                self._first_dirty_at = None
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+            if not paths:
+                return True
+
+            try:
+                files = self._read_changed(paths)
+                if not files:
+                    return True
+                for attempt in range(1, MAX_ATTEMPTS + 1):
+                    if self._commit(files):
+                        for path, content in files.items():
+                            self._pushed[path] = _git_blob_sha(content)
+                        logger.info(f"Pushed {', '.join(sorted(files))} to GitHub in one commit")
+                        return True
+                    logger.info(f"Branch {self.branch} moved; rebasing onto new head (attempt {attempt})")
+                    time.sleep(min(2 ** attempt, 10) / 4)
+                raise Exception(f"{self.branch} kept moving after {MAX_ATTEMPTS} attempts")
+            except Exception as e:
+                logger.error(f"GitHub push failed for {', '.join(sorted(paths))}: {e}")
+                # Keep them dirty so the next change (or exit) tries again.
+                with self._lock:
+                    self._dirty |= paths
+                return False
+
+
+_syncs = {}
+_sync_lock = threading.Lock()
+
+
+def _shared_sync(name, **kwargs):
+    with _sync_lock:
+        sync = _syncs.get(name)
+        if sync is None:
+            sync = _syncs[name] = WriteBehindSync(os.getenv("GITHUB_REPOSITORY"), os.getenv("GH_PAT"), **kwargs)
+            atexit.register(sync.flush)
+        return sync
+
+
+def get_scheduler_sync():
+    """Process-wide write-behind sync for GITHUB_REPOSITORY, flushed at exit."""
+    return _shared_sync("scheduler")
+
+
+def get_activity_sync():
+    """Like get_scheduler_sync(), but batches log uploads over minutes rather than seconds."""
+    return _shared_sync("activity", debounce=LOG_DEBOUNCE_SECONDS, max_delay=LOG_MAX_DELAY_SECONDS)
@@ -0,0 +1,167 @@
+# graph_usage.py
+
+import os
+import json
+import time
+import logging
+import threading
+
+# Set GRAPH_USAGE_PATH="" to keep usage in memory only.
+USAGE_PATH = os.getenv("GRAPH_USAGE_PATH", os.path.join(".cache", "graph_usage.json"))
+# Meta reports usage over a rolling hour; older samples say nothing about now.
+USAGE_WINDOW_SECONDS = 3600
+# Start spacing calls out here...
+SLOW_DOWN_PERCENT = float(os.getenv("GRAPH_USAGE_SLOW_AT", 75))
+# ...and stop calling here until Meta says access is back.
+BACK_OFF_PERCENT = float(os.getenv("GRAPH_USAGE_STOP_AT", 95))
+# Longest extra pause between calls while between the two thresholds.
+MAX_THROTTLE_SECONDS = 60
+# Pause used at BACK_OFF_PERCENT when Meta gives no estimated_time_to_regain_access.
+DEFAULT_BACK_OFF_SECONDS = 15 * 60
+
+USAGE_FIELDS = ("call_count", "total_cputime", "total_time")
+
+logger = logging.getLogger(__name__)
+
+
+class UsageTracker:
+    """Latest X-App-Usage and X-Business-Use-Case-Usage readings, per app and account.
+
+    observe() is fed every Graph response; delay_for() turns the highest
+    current utilisation into how long the next call should wait.
+    """
+
+    def __init__(self, path=USAGE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self):
+        if self.path:
+            try:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+                state.setdefault("app", None)
+                state.setdefault("accounts", {})
+                return state
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable usage file {self.path}: {e}")
+        return {"app": None, "accounts": {}}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._state, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write usage file {self.path}: {e}")
+
+    def observe(self, account, headers):
+        """Record the usage headers of one Graph response made for account."""
+        now = time.time()
+        changed = False
+        app = _parse(headers.get("X-App-Usage"))
+        buc = _parse(headers.get("X-Business-Use-Case-Usage"))
+        with self._lock:
+            if isinstance(app, dict):
+                self._state["app"] = dict(_percentages(app), at=now)
+                changed = True
+            if isinstance(buc, dict):
+                entries = [entry for values in buc.values() if isinstance(values, list) for entry in values]
+                if entries:
+                    usage = {field: max(_percent(e.get(field)) for e in entries) for field in USAGE_FIELDS}
+                    usage["regain_minutes"] = max(_percent(e.get("estimated_time_to_regain_access")) for e in entries)
+                    usage["at"] = now
+                    self._state["accounts"][account] = usage
+                    changed = True
+            if changed:
+                self._save()
+
+    def current(self, account=None):
+        """{"app"/"account": percent or None, "app_at"/"account_at": sample time, "regain_minutes": n, "at": newest sample}."""
+        now = time.time()
+        with self._lock:
+            app = self._state.get("app")
+            acct = self._state["accounts"].get(account) if account else None
+        app = app if app and now - app["at"] < USAGE_WINDOW_SECONDS else None
+        acct = acct if acct and now - acct["at"] < USAGE_WINDOW_SECONDS else None
+        return {
+            "app": max(app[f] for f in USAGE_FIELDS) if app else None,
+            "app_at": app["at"] if app else None,
+            "account": max(acct[f] for f in USAGE_FIELDS) if acct else None,
+            "account_at": acct["at"] if acct else None,
+            "regain_minutes": acct.get("regain_minutes", 0) if acct else 0,
+            "at": max([s["at"] for s in (app, acct) if s], default=None),
+        }
+
+    def delay_for(self, account):
+        """Seconds the next Graph call for account should wait (0 when there is headroom).
+
+        Back-offs count down from when their sample was taken: a throttled run
+        makes no calls, so the sample is never refreshed until a later run tries.
+        """
+        now = time.time()
+        usage = self.current(account)
+        if usage["regain_minutes"]:
+            remaining = usage["regain_minutes"] * 60 - (now - usage["account_at"])
+            if remaining > 0:
+                return remaining
+        peak, peak_at = 0, None
+        for value, at in ((usage["app"], usage["app_at"]), (usage["account"], usage["account_at"])):
+            if value is not None and value > peak:
+                peak, peak_at = value, at
+        if peak >= BACK_OFF_PERCENT:
+            remaining = DEFAULT_BACK_OFF_SECONDS - (now - peak_at)
+            if remaining > 0:
+                return remaining
+        if peak >= SLOW_DOWN_PERCENT:
+            # Also the probe after an expired back-off, whose answer refreshes the sample.
+            share = min((peak - SLOW_DOWN_PERCENT) / (BACK_OFF_PERCENT - SLOW_DOWN_PERCENT), 1)
+            return round(share * MAX_THROTTLE_SECONDS, 1)
+        return 0
+
+    def describe(self, account):
+        """Headroom line for the bot's status view."""
+        usage = self.current(account)
+        if usage["at"] is None:
+            return "no recent calls"
+        parts = []
+        if usage["app"] is not None:
+            parts.append(f"app {100 - usage['app']:.0f}% free")
+        if usage["account"] is not None:
+            parts.append(f"account {100 - usage['account']:.0f}% free")
+        delay = self.delay_for(account)
+        if delay > MAX_THROTTLE_SECONDS:
+            parts.append(f"backing off ~{delay / 60:.0f}m")
+        return ", ".join(parts)
+
+
+def _parse(value):
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        logger.debug(f"Unparseable usage header: {value!r}")
+        return None
+
+
+def _percent(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _percentages(usage):
+    return {field: _percent(usage.get(field)) for field in USAGE_FIELDS}
+
+
+# Shared by the uploaders and the Reels poller in one process.
+usage_tracker = UsageTracker()
@@ -0,0 +1,91 @@
+# handler_pool.py
+
+import os
+import logging
+import threading
+from collections import deque
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+
+# Handlers running at once across all users; each user still gets one at a time.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", 4))
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedSerialExecutor:
+    """Bounded thread pool that runs tasks for the same key strictly in submit order.
+
+    Each key has its own FIFO; at most one task per key is in flight, and at
+    most max_workers keys run at once. A slow task for one user only delays
+    that user's later taps, never anyone else's.
+    """
+
+    def __init__(self, max_workers=BOT_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bot-handler")
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None:
+                # A drain for this key is already scheduled; it will get to us.
+                queue.append((fn, args, kwargs))
+                return
+            self._queues[key] = deque([(fn, args, kwargs)])
+        self.pool.submit(self._drain, key)
+
+    def _drain(self, key):
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    return
+                fn, args, kwargs = queue.popleft()
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Handler {getattr(fn, '__name__', fn)} failed: {e}")
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+
+handler_pool = KeyedSerialExecutor()
+
+
+def _user_key(update):
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return update.effective_chat.id
+    return None
+
+
+def offloaded(func=None, ack=None):
+    """Run a PTB handler on handler_pool, in order with the same user's other updates.
+
+    With ack, callback queries are answered straight away on the dispatcher
+    thread so the button stops spinning while the real work runs (plain
+    messages get a "typing" indicator instead). Only use it for handlers that
+    don't call query.answer() themselves.
+    """
+    def decorate(handler):
+        @wraps(handler)
+        def wrapper(update, context, *args, **kwargs):
+            if ack:
+                try:
+                    if update.callback_query:
+                        update.callback_query.answer(ack)
+                    elif update.effective_chat:
+                        context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+                except Exception as e:
+                    logger.warning(f"Could not acknowledge update: {e}")
+            handler_pool.submit(_user_key(update), handler, update, context, *args, **kwargs)
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
@@ -0,0 +1,173 @@
+# http_client.py
+
+import os
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A Retry-After longer than this is better handled by the next run than by a blocked worker.
+MAX_RETRY_AFTER = 60
+POOL_MAXSIZE = 10
+# "host=http://127.0.0.1:8001,other.host=..." sends those hosts somewhere else
+# (e.g. the local stand-ins in bench/); unset in production.
+HOST_OVERRIDES = dict(
+    item.split("=", 1) for item in os.getenv("HTTP_HOST_OVERRIDES", "").split(",") if "=" in item
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CappedRetry(Retry):
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def override_url(url):
+    """Rewrite url's scheme and host per HOST_OVERRIDES; unchanged if the host isn't overridden."""
+    parts = urlsplit(url)
+    target = HOST_OVERRIDES.get(parts.netloc)
+    if not target:
+        return url
+    base = urlsplit(target)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+
+_request_listeners = []
+
+
+def add_request_listener(listener):
+    """Call listener(request) for every outbound request, on the sending thread."""
+    _request_listeners.append(listener)
+
+
+class ClientAdapter(HTTPAdapter):
+    """HTTPAdapter mounted on every pooled session, including the one the
+    Dropbox SDK uses: applies HOST_OVERRIDES and notifies request listeners."""
+
+    def send(self, request, **kwargs):
+        if HOST_OVERRIDES:
+            request.url = override_url(request.url)
+        for listener in _request_listeners:
+            try:
+                listener(request)
+            except Exception as e:
+                logger.debug(f"Request listener failed: {e}")
+        return super().send(request, **kwargs)
+
+
+def _adapter(**kwargs):
+    return ClientAdapter(**kwargs)
+
+
+def _retry(idempotent):
+    # Connect failures are always safe to retry (nothing reached the server).
+    # Read failures and 429/5xx are only retried for idempotent requests, so a
+    # media_publish POST is never sent twice.
+    return CappedRetry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        allowed_methods=None if idempotent else Retry.DEFAULT_ALLOWED_METHODS,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class HttpClient:
+    """Keep-alive sessions per host, with default timeouts and retry policy.
+
+    Every outbound call to graph.facebook.com, api.dropbox.com and
+    api.github.com goes through here, so each host's TLS connection is
+    opened once per process and reused.
+    """
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self, idempotent):
+        session = requests.Session()
+        adapter = _adapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=_retry(idempotent))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def session_for(self, url, idempotent=False):
+        host = urlsplit(url).netloc
+        key = (host, idempotent)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._new_session(idempotent)
+            return session
+
+    def request(self, method, url, idempotent=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Send a request; idempotent=True lets a POST be retried on read errors and 429/5xx."""
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in Retry.DEFAULT_ALLOWED_METHODS
+        session = self.session_for(url, idempotent)
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+http = HttpClient()
+
+
+def get(url, **kwargs):
+    return http.request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return http.request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return http.request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return http.request("PATCH", url, **kwargs)
+
+
+_dropbox_session = None
+_dropbox_session_lock = threading.Lock()
+
+
+def dropbox_session():
+    """One pooled session shared by every Dropbox client (the SDK does its own retries)."""
+    global _dropbox_session
+    with _dropbox_session_lock:
+        if _dropbox_session is None:
+            _dropbox_session = requests.Session()
+            adapter = _adapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+            _dropbox_session.mount("https://", adapter)
+        return _dropbox_session
+
+
+def telegram_base_url():
+    """Bot API base for python-telegram-bot's base_url (the token is appended to it)."""
+    return override_url("https://api.telegram.org/bot")
@@ -0,0 +1,549 @@
+# instagram_poster.py
+
+import os
+import time
+import json
+import logging
+import http_client
+from datetime import datetime
+from pytz import timezone, utc
+
+from accounts import PAUSED_PATH, MEDIA_EXTENSIONS, DUPLICATES_FOLDER, FAILED_FOLDER
+from schedule_index import load_schedule
+from dropbox_sync import get_folder_sync
+from media_queue import MediaQueue, DEFAULT_POLICY
+from post_journal import PostJournal
+from posted_index import PostedIndex
+from media_validation import PENDING, check as check_spec, get_media_info_cache, media_info_from_metadata
+from reels_poller import container_poller, FAILED_STATUSES, POLL_FAILED
+from token_cache import dropbox_tokens
+from run_metrics import RunTrace, publish as publish_metrics
+from graph_usage import usage_tracker, MAX_THROTTLE_SECONDS
+
+# Create and process containers during the wait window and publish at the slot.
+PRESTAGE_CONTAINERS = os.getenv("PRESTAGE_CONTAINERS", "true").lower() not in ("0", "false", "no")
+# Failed files tried per run before giving up until the next slot.
+MAX_FAILURES_PER_RUN = int(os.getenv("MAX_FAILURES_PER_RUN", 2))
+# Failures (across runs) after which a file is moved to FAILED_FOLDER; files
+# that fail the media spec go there straight away.
+MAX_FILE_FAILURES = int(os.getenv("MAX_FILE_FAILURES", 3))
+# Graph errors every file of the account would hit: auth (190, 102), missing
+# permissions (10, 200-299) and rate limits (4, 17, 32, 613). Any other 4xx
+# is blamed on the file and counts towards MAX_FILE_FAILURES.
+ACCOUNT_ERROR_CODES = {190, 102, 10, 4, 17, 32, 613, *range(200, 300)}
+
+# dropbox, telegram and nacl are imported lazily: most cron ticks fall outside
+# every slot and should exit before paying for those imports or any network I/O.
+
+class GraphThrottled(Exception):
+    """Graph usage is too high to create containers this run."""
+
+
+class ContainerPending(Exception):
+    """The container is still processing; the journal lets the next run pick it up."""
+
+
+class FileRejected(Exception):
+    """Instagram or Dropbox refused this one file; only these count towards MAX_FILE_FAILURES."""
+
+
+class PostingBlocked(Exception):
+    """A failure that is not the file's fault (auth, rate limits, outages); every other file would hit it too."""
+
+
+def graph_error(res):
+    """The exception for a failed Graph call: FileRejected unless the whole account is affected."""
+    try:
+        error = res.json().get("error", {})
+    except ValueError:
+        error = {}
+    message = f"{error.get('message', res.text)} (code {error.get('code', 'N/A')})"
+    if res.status_code >= 500 or error.get("code") in ACCOUNT_ERROR_CODES or error.get("is_transient"):
+        return Exception(message)
+    return FileRejected(message)
+
+
+class DropboxToInstagramUploader:
+    INSTAGRAM_API_BASE = "https://graph.facebook.com/v18.0"
+    EARLIEST_SLOT_SECONDS = -120
+
+    def __init__(self, account):
+        self.account = account
+        self.script_name = f"{account.name} poster"
+        self.ist = timezone('Asia/Kolkata')
+        self.MAX_WAIT_SECONDS = int(os.getenv("MAX_WAIT_SECONDS", 600))
+        self.logger = logging.getLogger(f"poster.{account.name}")
+
+        # Secrets
+        self.instagram_access_token = account.instagram_access_token
+        self.instagram_account_id = account.instagram_account_id
+        self.dropbox_app_key = account.dropbox_app_key
+        self.dropbox_app_secret = account.dropbox_app_secret
+        self.dropbox_refresh_token = account.dropbox_refresh_token
+        self.telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        self.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        self.repo = os.getenv("GITHUB_REPOSITORY")
+        self.gh_pat = os.getenv("GH_PAT")
+
+        self.dropbox_folder = account.folder
+        self.telegram_bot = None
+        self.dbx = None
+        self.folder_sync = None
+        self.queue = None
+        self.journal = None
+        self.posted_index = None
+        self.media_info = None
+        self.failures_this_run = 0
+        self.to_quarantine = []
+        # Secret writes are collected and flushed together by the engine.
+        self.pending_secrets = {}
+
+        self.trace = RunTrace(account.name)
+        self.audit_log = []
+        self.add_audit("📡 Run started at: " + datetime.now(self.ist).strftime('%Y-%m-%d %H:%M:%S'))
+
+    def connect(self):
+        """Refresh the Dropbox token and open the client once a post is due."""
+        import dropbox
+
+        try:
+            with self.trace.span("token_refresh"):
+                self.dropbox_access_token = self.refresh_dropbox_token()
+            self.dbx = dropbox.Dropbox(
+                oauth2_access_token=self.dropbox_access_token,
+                session=http_client.dropbox_session(),
+                timeout=http_client.READ_TIMEOUT
+            )
+            self.folder_sync = get_folder_sync(self.dbx, self.account.name, self.dropbox_folder)
+            self.media_info = get_media_info_cache()
+            self.queue = MediaQueue(self.account.name, self.account.queue_policy or DEFAULT_POLICY)
+            self.journal = PostJournal(self.account.name)
+            self.posted_index = PostedIndex(self.account.name)
+        except Exception as e:
+            self.add_audit(f"❌ Dropbox token refresh failed: {e}")
+            self.finish("error")
+            raise
+
+    def add_audit(self, msg):
+        self.audit_log.append(msg)
+
+    def send_audit_summary(self):
+        full = f"[{self.script_name}]\n" + "\n".join(self.audit_log)
+        try:
+            if self.telegram_bot is None:
+                from telegram import Bot
+                from telegram.utils.request import Request
+                self.telegram_bot = Bot(
+                    token=self.telegram_bot_token,
+                    base_url=http_client.telegram_base_url(),
+                    request=Request(connect_timeout=http_client.CONNECT_TIMEOUT, read_timeout=http_client.READ_TIMEOUT)
+                )
+            self.telegram_bot.send_message(chat_id=self.telegram_chat_id, text=full)
+        except Exception as e:
+            self.logger.error(f"Telegram send error: {e}")
+
+    def finish(self, outcome):
+        """Close the run: quarantine, timing summary into the audit message, then the run record."""
+        # Before the summary goes out, so its outcome is part of the message.
+        self.quarantine_failed()
+        self.add_audit(self.trace.summary())
+        self.send_audit_summary()
+        publish_metrics(self.trace, outcome)
+
+    def refresh_dropbox_token(self):
+        token, refreshed = dropbox_tokens.get_or_refresh(
+            self.account.name,
+            self.dropbox_app_key,
+            self.dropbox_app_secret,
+            self.dropbox_refresh_token
+        )
+        if refreshed:
+            self.pending_secrets[self.account.dropbox_token_secret] = token
+            self.add_audit("🔁 Dropbox token refreshed.")
+        else:
+            self.add_audit("♻️ Reusing cached Dropbox token.")
+        return token
+
+    def is_paused(self, paused=None):
+        try:
+            if paused is None:
+                with open(PAUSED_PATH, "r") as f:
+                    paused = json.load(f)
+            return bool(paused.get(self.account.name, False))
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.add_audit(f"⚠️ Pause check error: {e}")
+            return False
+
+    def seconds_until_slot(self, schedule=None):
+        """Seconds until a slot in [-120s, MAX_WAIT_SECONDS] from now, or None."""
+        schedule = schedule or load_schedule()
+        delta = schedule.slot_within(self.account.name, self.EARLIEST_SLOT_SECONDS, self.MAX_WAIT_SECONDS)
+        if delta is None:
+            now_ist = datetime.now(utc).astimezone(self.ist)
+            next_slot = schedule.next_slot(self.account.name)
+            upcoming = next_slot.strftime('%A %H:%M') if next_slot else "none"
+            self.add_audit(f"⏰ Not in schedule. Current: {now_ist.strftime('%A %H:%M')}, Next: {upcoming}")
+        return delta
+
+    def is_scheduled_time(self, delta=None):
+        try:
+            if delta is None:
+                delta = self.seconds_until_slot()
+            if delta is None:
+                return False
+            if delta > 0:
+                self.add_audit(f"⏳ Sleeping {delta}s for slot")
+                time.sleep(delta)
+            return True
+        except Exception as e:
+            self.add_audit(f"⚠️ Schedule check error: {e}")
+            return True
+
+    def list_dropbox_files(self):
+        """Sync the folder into the queue and return its files in policy order."""
+        try:
+            with self.trace.span("list_folder"):
+                # Applies only what changed since the stored cursor, across all pages.
+                entries = self.folder_sync.sync()
+                if self.folder_sync.last_changes is None or self.folder_sync.since != self.queue.cursor:
+                    # First listing, a reset cursor, or a delta an earlier run saved to the
+                    # manifest but never got into the queue: reconcile against the whole manifest.
+                    media = self.media_only(entries)
+                    removed = [path for path in (*self.queue.items, *self.queue.held) if path not in media]
+                else:
+                    # Otherwise only the delta touches the queue, however deep it is.
+                    upserted, removed = self.folder_sync.last_changes
+                    media = self.media_only(upserted)
+                # Drop vanished files first, so a renamed file is not its own duplicate.
+                self.queue.update({}, removed)
+                # The cursor is only recorded once the queue holds what it led to.
+                self.queue.update(self.set_aside_duplicates(media), (), cursor=self.folder_sync.cursor)
+                self.journal.prune(self.queue.items)
+            self.add_audit(f"📦 {len(self.queue)} media files queued ({self.queue.policy}).")
+            return self.queue.iter_ordered()
+        except Exception as e:
+            self.add_audit(f"❌ Dropbox list failed: {e}")
+            return iter(())
+
+    @staticmethod
+    def media_only(entries):
+        return {path: e for path, e in entries.items() if e["name"].lower().endswith(MEDIA_EXTENSIONS)}
+
+    def set_aside_duplicates(self, media):
+        """Drop new or edited files whose content was already posted or queued, moving them out in one batch."""
+        # Duplicates whose move failed earlier are held out of the queue and retried here.
+        candidates = dict(self.queue.held)
+        for path, e in media.items():
+            queued = self.queue.get(path)
+            # New files, and queued ones edited in place to different content.
+            if queued is None or queued.content_hash != e.get("content_hash"):
+                candidates[path] = e
+        if not candidates:
+            return media
+        seen = set()
+        duplicates = []
+        for path in sorted(candidates, key=lambda p: candidates[p].get("server_modified") or ""):
+            content_hash = candidates[path].get("content_hash")
+            if content_hash in seen or self.queue.has_content(content_hash) or content_hash in self.posted_index:
+                duplicates.append(path)
+            elif content_hash:
+                seen.add(content_hash)
+        released = [path for path in self.queue.held if path not in duplicates]
+        media = {**media, **{path: candidates[path] for path in released}}
+        self.queue.release(released)
+        if not duplicates:
+            return media
+
+        names = ", ".join(candidates[path]["name"] for path in duplicates[:5]) + (" …" if len(duplicates) > 5 else "")
+        moved = []
+        try:
+            moved = self.folder_sync.move_to(duplicates, DUPLICATES_FOLDER)
+            self.add_audit(f"🧬 Moved {len(moved)}/{len(duplicates)} duplicate(s) to /{DUPLICATES_FOLDER}: {names}")
+        except Exception as e:
+            self.add_audit(f"⚠️ Could not move duplicates ({names}): {e}")
+        self.queue.release(moved)
+        for path in duplicates:
+            self.queue.discard(path)
+        self.queue.hold({path: candidates[path] for path in duplicates if path not in moved})
+        duplicates = set(duplicates)
+        return {path: e for path, e in media.items() if path not in duplicates}
+
+    def check_media(self, file):
+        """Why file cannot be posted under the media spec, PENDING, or None when it fits."""
+        info = self.media_info.get(file.content_hash)
+        if info is None:
+            # list_folder has ignored include_media_info since 2019, so there is no
+            # bulk path: ask for this one file, once per content_hash.
+            try:
+                md = self.dbx.files_get_metadata(file.path_lower, include_media_info=True)
+                info = media_info_from_metadata(md.media_info)
+            except Exception as e:
+                # Not cached: a failed lookup must not switch the checks off for good.
+                self.logger.warning(f"Media info lookup failed for {file.name}: {e}")
+                return check_spec(file.media_type, file.size, {})
+            self.media_info.put(file.content_hash, info)
+            self.media_info.save()
+        return check_spec(file.media_type, file.size, info)
+
+    def create_container(self, file):
+        """Issue a temporary link and create the media container; returns its creation_id."""
+        from dropbox.exceptions import ApiError
+
+        with self.trace.span("temporary_link"):
+            try:
+                temp_link = self.dbx.files_get_temporary_link(file.path_lower).link
+            except ApiError as e:
+                # Path-specific (not found, not a file, ...); auth and outages raise other errors.
+                raise FileRejected(f"Dropbox could not link it: {e.error}") from e
+        self.journal.record(file, "link_issued")
+        size = f"{file.size / 1024 / 1024:.2f}MB"
+        self.add_audit(f"🚀 Uploading {file.name} ({file.media_type}, {size})")
+
+        delay = usage_tracker.delay_for(self.account.name)
+        if delay > MAX_THROTTLE_SECONDS:
+            raise GraphThrottled(f"Graph usage at its limit; backing off for {delay / 60:.0f}m")
+        if delay:
+            self.add_audit(f"🚦 Graph usage high; waiting {delay:.0f}s before creating the container")
+            with self.trace.span("throttle"):
+                time.sleep(delay)
+
+        with self.trace.span("create_container") as span:
+            res = http_client.post(
+                f"{self.INSTAGRAM_API_BASE}/{self.instagram_account_id}/media",
+                data={
+                    "access_token": self.instagram_access_token,
+                    "caption": self.account.caption,
+                    **({"image_url": temp_link} if file.media_type == "IMAGE" else {
+                        "media_type": "REELS",
+                        "video_url": temp_link,
+                        "share_to_feed": "true" if self.account.share_to_feed else "false"
+                    })
+                }
+            )
+            span["ok"] = res.status_code == 200
+        usage_tracker.observe(self.account.name, res.headers)
+        if res.status_code != 200:
+            raise graph_error(res)
+        creation_id = res.json()["id"]
+        self.journal.record(file, "container_created", creation_id=creation_id)
+        return creation_id
+
+    def wait_for_container(self, file, creation_id, resumed=False):
+        """Poll until the container can be published; returns its last status_code.
+
+        Images are ready as soon as they are created, so only Reels and resumed
+        containers (which may have expired or already been published) are polled.
+        """
+        if file.media_type != "REELS" and not resumed:
+            return "FINISHED"
+        poll = container_poller.wait(creation_id, self.instagram_access_token, account=self.account.name)
+        # Polling runs on the shared poller thread, so it is recorded rather than spanned.
+        self.trace.record("reels_poll", poll.elapsed, requests=poll.polls, ok=poll.finished)
+        self.add_audit(f"🎞️ Container {poll.status} after {poll.polls} polls ({poll.elapsed:.0f}s)")
+        if poll.finished:
+            return poll.status
+        if poll.status in FAILED_STATUSES:
+            # Nothing left to resume; the next attempt starts from a fresh link.
+            self.journal.remove(file.path_lower)
+            if poll.status == "ERROR":
+                raise FileRejected(f"IG processing error{': ' + poll.error if poll.error else ''}")
+            raise Exception(f"IG processing {poll.status.lower()}")
+        self.journal.record(file, "processing", status=poll.status)
+        if poll.status == POLL_FAILED:
+            # The container may still be fine; the journal lets a later run check again.
+            raise Exception(f"Container status unavailable: {poll.error}")
+        raise ContainerPending(f"{file.name} still processing; container {creation_id} kept for the next run")
+
+    def publish_container(self, file, creation_id):
+        with self.trace.span("media_publish") as span:
+            pub = http_client.post(
+                f"{self.INSTAGRAM_API_BASE}/{self.instagram_account_id}/media_publish",
+                data={"creation_id": creation_id, "access_token": self.instagram_access_token}
+            )
+            span["ok"] = pub.status_code == 200
+        usage_tracker.observe(self.account.name, pub.headers)
+        if pub.status_code != 200:
+            error = graph_error(pub)
+            if isinstance(error, FileRejected):
+                # The container is unusable; the next attempt starts from a fresh one.
+                self.journal.remove(file.path_lower)
+            raise error
+        self.journal.record(file, "published", media_id=pub.json().get("id"))
+        self.posted_index.add(file.content_hash)
+        self.add_audit(f"✅ Uploaded: {file.name}")
+
+    def remove_source(self, path_lower, name):
+        """Delete a published file from Dropbox; the journal keeps it for a later run on failure."""
+        from dropbox.exceptions import ApiError
+
+        try:
+            with self.trace.span("delete"):
+                try:
+                    self.dbx.files_delete_v2(path_lower)
+                except ApiError as e:
+                    lookup = e.error.get_path_lookup() if e.error.is_path_lookup() else None
+                    if not (lookup and lookup.is_not_found()):
+                        raise
+                self.folder_sync.remove(path_lower)
+                self.queue.mark_posted(path_lower)
+                self.journal.remove(path_lower)
+            self.add_audit(f"🗑️ Removed {name} from Dropbox\n📦 Files left: {len(self.queue)}")
+        except Exception as e:
+            self.add_audit(f"⚠️ Could not remove {name} from Dropbox, will retry next run: {e}")
+
+    def finish_published(self):
+        """Remove sources left behind by runs that published but did not get to delete."""
+        for path, entry in self.journal.published().items():
+            self.add_audit(f"♻️ {entry['name']} was already published")
+            self.remove_source(path, entry["name"])
+
+    def resumable_first(self, files):
+        """Yield journaled files with a live container ahead of the queue order."""
+        resumed = [f for f in map(self.queue.get, self.journal.with_container()) if f]
+        yield from resumed
+        # Published files whose delete failed again must not be posted twice.
+        skip = {f.path_lower for f in resumed} | set(self.journal.published())
+        for file in files:
+            if file.path_lower not in skip:
+                yield file
+
+    def post_to_instagram(self, file, publish_at=None):
+        """Stage the container, then publish it at publish_at (a time.monotonic() value) or now.
+
+        A container journaled by an earlier run is re-polled and published
+        instead of being created again.
+        """
+        try:
+            entry = self.journal.get(file.path_lower)
+            if entry and entry.get("creation_id"):
+                creation_id = entry["creation_id"]
+                self.add_audit(f"♻️ Resuming {file.name} from {entry['stage']} (container {creation_id})")
+                status = self.wait_for_container(file, creation_id, resumed=True)
+                if status == "PUBLISHED":
+                    # The earlier run published (for its own slot) but died before
+                    # journaling it; tidy up and carry on with the next file.
+                    self.journal.record(file, "published")
+                    self.posted_index.add(file.content_hash)
+                    self.remove_source(file.path_lower, file.name)
+                    return False
+            else:
+                problem = self.check_media(file)
+                if problem == PENDING:
+                    self.add_audit(f"⏳ Dropbox is still reading {file.name}; trying the next file")
+                    return False
+                if problem:
+                    # Instagram would reject it anyway; keep it away from the Graph API for good.
+                    self.add_audit(f"🚫 {file.name} does not fit Instagram's limits: {problem}")
+                    self.to_quarantine.append(file)
+                    return False
+                creation_id = self.create_container(file)
+                self.wait_for_container(file, creation_id)
+
+            if publish_at is not None:
+                delay = publish_at - time.monotonic()
+                if delay > 0:
+                    self.add_audit(f"⏳ Container ready; publishing in {delay:.0f}s at the slot")
+                    with self.trace.span("wait_for_slot"):
+                        time.sleep(delay)
+
+            self.publish_container(file, creation_id)
+            self.remove_source(file.path_lower, file.name)
+            return True
+        except (GraphThrottled, ContainerPending):
+            raise
+        except FileRejected as e:
+            self.add_audit(f"❌ Post failed: {e}")
+            self.record_failure(file, e)
+            return False
+        except Exception as e:
+            # Not the file's fault, so its failure count is left alone.
+            raise PostingBlocked(f"{file.name}: {e}") from e
+
+    def record_failure(self, file, error):
+        self.failures_this_run += 1
+        failures = self.queue.record_failure(file.path_lower, error)
+        if failures >= MAX_FILE_FAILURES:
+            self.to_quarantine.append(file)
+
+    def quarantine_failed(self):
+        """Move files that keep failing (or can never pass) to FAILED_FOLDER in one batch."""
+        if not self.to_quarantine:
+            return
+        files = {file.path_lower: file for file in self.to_quarantine}
+        self.to_quarantine = []
+        try:
+            moved = self.folder_sync.move_to(files, FAILED_FOLDER)
+        except Exception as e:
+            self.add_audit(f"⚠️ Could not move failing files to /{FAILED_FOLDER}: {e}")
+            return
+        for path in moved:
+            self.queue.discard(path)
+            self.journal.remove(path)
+        names = ", ".join(files[path].name for path in moved)
+        self.add_audit(f"🧯 Moved to /{FAILED_FOLDER}: {names}")
+
+    def run(self, due_in=None):
+        """Post one file if a slot is due; due_in skips the lookup when the caller already did it."""
+        # No-op ticks stay local: nothing is sent until a post is actually due.
+        if due_in is None and self.is_paused():
+            self.logger.info("⏸️ Account paused, skipping.")
+            return False
+
+        if PRESTAGE_CONTAINERS:
+            # Use the wait window to link, create and process the container, so
+            # the slot itself only costs the media_publish call.
+            if due_in is None:
+                due_in = self.seconds_until_slot()
+            if due_in is None:
+                self.logger.info("\n".join(self.audit_log))
+                return False
+            publish_at = time.monotonic() + max(due_in, 0)
+            if due_in > 0:
+                self.add_audit(f"🧰 Pre-staging {due_in}s ahead of the slot")
+        else:
+            if not self.is_scheduled_time(due_in):
+                self.logger.info("\n".join(self.audit_log))
+                return False
+            publish_at = None
+
+        self.connect()
+        self.finish_published()
+        files = self.resumable_first(self.list_dropbox_files())
+
+        posted = False
+        attempted = False
+        try:
+            for file in files:
+                attempted = True
+                if self.post_to_instagram(file, publish_at):
+                    posted = True
+                    break
+                if self.failures_this_run >= MAX_FAILURES_PER_RUN:
+                    # A poisoned queue must not eat the whole runner; the rest waits for the next slot.
+                    self.add_audit(f"🛑 {self.failures_this_run} failed attempts; stopping for this run")
+                    break
+        except GraphThrottled as e:
+            # Every other file would hit the same limit; leave them for the next slot.
+            self.add_audit(f"🚦 {e}")
+            self.finish("throttled")
+            return False
+        except ContainerPending as e:
+            # No time left for another file this run either.
+            self.add_audit(f"⏸️ {e}")
+            self.finish("pending")
+            return False
+        except PostingBlocked as e:
+            self.add_audit(f"❌ Post failed, stopping for this run: {e}")
+            self.finish("failed")
+            return False
+
+        if not attempted:
+            self.add_audit("📭 No media to post.")
+            self.finish("empty")
+            return False
+
+        self.add_audit("🏁 Run complete.")
+        self.finish("posted" if posted else "failed")
+        return posted
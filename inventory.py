@@ -0,0 +1,106 @@
+# inventory.py
+
+import os
+import time
+import logging
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Counts younger than this are served as-is...
+INVENTORY_TTL_SECONDS = int(os.getenv("INVENTORY_TTL", 120))
+# ...older ones are still served, with a refresh started in the background,
+# until they pass this age and the caller waits for a fresh count instead.
+INVENTORY_MAX_STALE_SECONDS = int(os.getenv("INVENTORY_MAX_STALE", 3600))
+INVENTORY_WORKERS = int(os.getenv("INVENTORY_WORKERS", 3))
+
+logger = logging.getLogger(__name__)
+
+
+def describe_age(seconds):
+    if seconds is None:
+        return "never"
+    if seconds < 10:
+        return "just now"
+    if seconds < 60:
+        return f"{int(seconds)}s ago"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m ago"
+    return f"{int(seconds // 3600)}h ago"
+
+
+class Inventory:
+    """Per-account Dropbox file counts with a TTL and stale-while-revalidate.
+
+    fetch(account) returns the current count or raises. Refreshes for
+    different accounts run concurrently; concurrent requests for the same
+    account share one in-flight fetch. Snapshots carry count, fetched_at
+    (epoch seconds) and error; a failed refresh keeps the last good count.
+    """
+
+    def __init__(self, fetch, ttl=INVENTORY_TTL_SECONDS, max_stale=INVENTORY_MAX_STALE_SECONDS,
+                 max_workers=INVENTORY_WORKERS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inventory")
+        self._snapshots = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, account):
+        started = time.time()
+        try:
+            snapshot = SimpleNamespace(count=self.fetch(account), fetched_at=time.time(), error=None)
+            logger.info(f"Inventory for {account}: {snapshot.count} files ({snapshot.fetched_at - started:.1f}s)")
+        except Exception as e:
+            logger.error(f"Inventory refresh failed for {account}: {e}")
+            previous = self._snapshots.get(account)
+            # Keep serving the last good count, but flag it.
+            snapshot = SimpleNamespace(
+                count=previous.count if previous else None,
+                fetched_at=previous.fetched_at if previous else None,
+                error=str(e),
+            )
+        with self._lock:
+            self._snapshots[account] = snapshot
+            self._inflight.pop(account, None)
+        return snapshot
+
+    def _start_refresh(self, account):
+        with self._lock:
+            future = self._inflight.get(account)
+            if future is None:
+                future = self._inflight[account] = self.pool.submit(self._fetch, account)
+            return future
+
+    def age(self, snapshot):
+        if snapshot is None or snapshot.fetched_at is None:
+            return None
+        return time.time() - snapshot.fetched_at
+
+    def refresh(self, accounts, wait_for=True):
+        """Refetch the given accounts concurrently; optionally block until all are done."""
+        futures = [self._start_refresh(account) for account in accounts]
+        if wait_for:
+            wait(futures)
+
+    def get_many(self, accounts):
+        """Return {account: snapshot}, waiting only for accounts with no usable count."""
+        pending = {}
+        for account in accounts:
+            snapshot = self._snapshots.get(account)
+            age = self.age(snapshot)
+            if age is None or age > self.max_stale:
+                pending[account] = self._start_refresh(account)
+            elif age > self.ttl:
+                self._start_refresh(account)
+        wait(pending.values())
+        return {account: self._snapshots.get(account) for account in accounts}
+
+    def get(self, account):
+        return self.get_many([account])[account]
+
+    def peek(self, account):
+        """The cached snapshot without triggering any fetch (None if never fetched)."""
+        return self._snapshots.get(account)
@@ -0,0 +1,305 @@
+# media_queue.py
+
+import os
+import json
+import time
+import heapq
+import logging
+import threading
+from itertools import islice
+from types import SimpleNamespace
+
+from accounts import VIDEO_EXTENSIONS
+
+# Set MEDIA_QUEUE_DIR="" to keep queues in memory only.
+QUEUE_STATE_DIR = os.getenv("MEDIA_QUEUE_DIR", os.path.join(".cache", "queue"))
+DEFAULT_POLICY = os.getenv("QUEUE_POLICY", "oldest_first")
+# Comma-separated; earlier prefixes win. Used by the prefix_priority policy.
+PRIORITY_PREFIXES = tuple(p for p in os.getenv("QUEUE_PRIORITY_PREFIXES", "!,urgent_").split(",") if p)
+
+logger = logging.getLogger(__name__)
+
+
+def media_type_for(name):
+    return "REELS" if name.lower().endswith(VIDEO_EXTENSIONS) else "IMAGE"
+
+
+def _oldest_first_key(item):
+    return (item["enqueued_at"], item.get("server_modified") or "", item["name"])
+
+
+def _prefix_priority_key(item):
+    name = item["name"].lower()
+    rank = next((i for i, prefix in enumerate(PRIORITY_PREFIXES) if name.startswith(prefix.lower())),
+                len(PRIORITY_PREFIXES))
+    return (rank,) + _oldest_first_key(item)
+
+
+# Policy name -> (sort key, alternate media types?)
+POLICIES = {
+    "oldest_first": (_oldest_first_key, False),
+    "prefix_priority": (_prefix_priority_key, False),
+    "alternate": (_oldest_first_key, True),
+}
+
+
+class MediaQueue:
+    """Persistent per-account queue of postable files, ordered by a policy.
+
+    Items are kept in one heap per media type (a single heap unless the policy
+    alternates), so choosing the next file is O(log n) and never needs Dropbox.
+    Removed items are dropped lazily when they surface at the top of a heap;
+    each heap entry carries its item's generation, so a path that was removed
+    and re-added never surfaces through its old entry.
+    update() applies a listing delta and iter_ordered() walks the heaps
+    lazily, so a run's cost follows what changed, not how deep the queue is.
+    """
+
+    def __init__(self, account, policy=DEFAULT_POLICY, state_dir=QUEUE_STATE_DIR):
+        if policy not in POLICIES:
+            logger.warning(f"Unknown queue policy {policy!r} for {account}; using oldest_first")
+            policy = "oldest_first"
+        self.account = account
+        self.policy = policy
+        self.key, self.alternate = POLICIES[policy]
+        self.path = os.path.join(state_dir, f"{account}.json") if state_dir else None
+        self.items = {}
+        # Files kept out of the queue (e.g. duplicates) until they are moved away.
+        self.held = {}
+        # Listing cursor of the last delta applied, saved with the items it produced.
+        self.cursor = None
+        self.last_media_type = None
+        self._heaps = {}
+        self._hashes = {}
+        # path_lower -> generation of its live heap entry; in memory only.
+        self._generations = {}
+        self._generation = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path:
+            try:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+                self.items = state.get("items", {})
+                self.held = state.get("held", {})
+                self.cursor = state.get("cursor")
+                self.last_media_type = state.get("last_media_type")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable queue {self.path}: {e}")
+        self._rebuild()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"items": self.items, "held": self.held, "cursor": self.cursor,
+                           "last_media_type": self.last_media_type}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write queue {self.path}: {e}")
+
+    def _heap_name(self, item):
+        return item["media_type"] if self.alternate else "all"
+
+    def _entry(self, item):
+        self._generation += 1
+        self._generations[item["path_lower"]] = self._generation
+        return (self.key(item), self._generation, item["path_lower"])
+
+    def _live(self, entry):
+        return self._generations.get(entry[2]) == entry[1]
+
+    def _push(self, item):
+        heap = self._heaps.setdefault(self._heap_name(item), [])
+        heapq.heappush(heap, self._entry(item))
+        self._version += 1
+
+    def _rebuild(self):
+        self._heaps = {}
+        self._hashes = {}
+        self._generations = {}
+        for item in self.items.values():
+            self._heaps.setdefault(self._heap_name(item), []).append(self._entry(item))
+            self._count_hash(item, 1)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        self._version += 1
+
+    def _count_hash(self, item, delta):
+        content_hash = item.get("content_hash")
+        if content_hash:
+            count = self._hashes.get(content_hash, 0) + delta
+            if count > 0:
+                self._hashes[content_hash] = count
+            else:
+                self._hashes.pop(content_hash, None)
+
+    def _add(self, path, entry, now):
+        item = {
+            "name": entry["name"],
+            "path_lower": path,
+            "size": entry.get("size", 0),
+            "content_hash": entry.get("content_hash"),
+            "server_modified": entry.get("server_modified"),
+            "media_type": media_type_for(entry["name"]),
+            "enqueued_at": now,
+        }
+        self.items[path] = item
+        self._push(item)
+        self._count_hash(item, 1)
+
+    def _remove(self, path):
+        item = self.items.pop(path, None)
+        if item is not None:
+            self._generations.pop(path, None)
+            self._count_hash(item, -1)
+        return item
+
+    def update(self, upserted, removed, cursor=None):
+        """Apply a listing delta: {path_lower: entry} added or modified, and removed paths.
+
+        cursor, if given, is recorded as the listing position the queue is now
+        current with, in the same write as the delta.
+        """
+        with self._lock:
+            moved = cursor is not None and cursor != self.cursor
+            if moved:
+                self.cursor = cursor
+            now = time.time()
+            added = 0
+            for path, entry in upserted.items():
+                item = self.items.get(path)
+                if item is None:
+                    self._add(path, entry, now)
+                    added += 1
+                elif item.get("content_hash") != entry.get("content_hash"):
+                    # Edited in place: keeps its place in line, under the new content.
+                    self._count_hash(item, -1)
+                    item.update(size=entry.get("size", 0), content_hash=entry.get("content_hash"),
+                                server_modified=entry.get("server_modified"))
+                    item.pop("failures", None)
+                    self._count_hash(item, 1)
+            dropped = sum(1 for path in removed if self._remove(path) is not None)
+            gone = [path for path in removed if self.held.pop(path, None) is not None]
+            if upserted or dropped or gone or moved:
+                self._save()
+            return added, dropped
+
+    def hold(self, entries):
+        """Keep {path_lower: entry} out of the queue; they are offered again on every run until released."""
+        if entries:
+            with self._lock:
+                self.held.update(entries)
+                self._save()
+
+    def release(self, paths):
+        with self._lock:
+            if sum(1 for path in paths if self.held.pop(path, None) is not None):
+                self._save()
+
+    def has_content(self, content_hash):
+        with self._lock:
+            return content_hash in self._hashes
+
+    def _top(self, heap):
+        # Lazy deletion: discard heap entries whose item is gone or was re-added since.
+        while heap and not self._live(heap[0]):
+            heapq.heappop(heap)
+            self._version += 1
+        return heap[0] if heap else None
+
+    def _order_media_types(self, last_media_type):
+        if not self.alternate:
+            return ["all"]
+        preferred = "IMAGE" if last_media_type == "REELS" else "REELS"
+        other = "REELS" if preferred == "IMAGE" else "IMAGE"
+        return [preferred, other]
+
+    def peek(self):
+        with self._lock:
+            for name in self._order_media_types(self.last_media_type):
+                top = self._top(self._heaps.get(name, []))
+                if top:
+                    return SimpleNamespace(**self.items[top[2]])
+            return None
+
+    def iter_ordered(self):
+        """Yield items in policy order without consuming the queue.
+
+        Each heap is walked through a small frontier of its indices (a node's
+        children are never smaller than it), so taking the first k items costs
+        O(k log k) whatever the queue length. If the heaps change mid-walk the
+        frontier restarts from the roots, skipping what was already yielded.
+        """
+        seen = set()
+        frontiers = {}
+        version = None
+        with self._lock:
+            last_media_type = self.last_media_type
+
+        while True:
+            with self._lock:
+                if version != self._version:
+                    version = self._version
+                    frontiers = {name: [(heap[0], 0)] if heap else [] for name, heap in self._heaps.items()}
+                chosen = None
+                for name in self._order_media_types(last_media_type):
+                    heap, frontier = self._heaps.get(name, []), frontiers.get(name, [])
+                    while frontier:
+                        entry, index = heapq.heappop(frontier)
+                        for child in (2 * index + 1, 2 * index + 2):
+                            if child < len(heap):
+                                heapq.heappush(frontier, (heap[child], child))
+                        if self._live(entry) and entry[2] not in seen:
+                            chosen = entry[2]
+                            break
+                    if chosen:
+                        break
+                if chosen is None:
+                    return
+                seen.add(chosen)
+                item = dict(self.items[chosen])
+            last_media_type = item["media_type"]
+            yield SimpleNamespace(**item)
+
+    def get(self, path_lower):
+        with self._lock:
+            item = self.items.get(path_lower)
+            return SimpleNamespace(**item) if item else None
+
+    def upcoming(self, limit=10):
+        return list(islice(self.iter_ordered(), limit))
+
+    def mark_posted(self, path_lower):
+        with self._lock:
+            item = self._remove(path_lower)
+            if item is not None:
+                self.last_media_type = item["media_type"]
+                self._save()
+
+    def record_failure(self, path_lower, error):
+        """Count a failed post of path_lower; returns its failures so far."""
+        with self._lock:
+            item = self.items.get(path_lower)
+            if item is None:
+                return 0
+            item["failures"] = item.get("failures", 0) + 1
+            item["last_error"] = str(error)[:200]
+            self._save()
+            return item["failures"]
+
+    def discard(self, path_lower):
+        with self._lock:
+            if self._remove(path_lower) is not None:
+                self._save()
+
+    def __len__(self):
+        return len(self.items)
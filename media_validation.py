@@ -0,0 +1,167 @@
+# media_validation.py
+
+import os
+import json
+import time
+import logging
+import threading
+
+# Set MEDIA_INFO_PATH="" to keep media info in memory only.
+MEDIA_INFO_PATH = os.getenv("MEDIA_INFO_PATH", os.path.join(".cache", "media_info.json"))
+# Oldest entries are dropped past this; each is a few dozen bytes.
+MEDIA_INFO_MAX_ENTRIES = 50000
+
+# Instagram's Content Publishing limits. Aspect ratios are width / height,
+# durations in seconds. Override per media type with MEDIA_SPEC, e.g.
+# MEDIA_SPEC='{"REELS": {"max_duration": 90}}'.
+DEFAULT_SPEC = {
+    "IMAGE": {
+        "max_bytes": 8 * 1024 * 1024,
+        "min_aspect": 4 / 5,
+        "max_aspect": 1.91,
+    },
+    "REELS": {
+        "max_bytes": 1024 * 1024 * 1024,
+        "min_aspect": 0.01,
+        "max_aspect": 10,
+        "max_width": 1920,
+        "min_duration": 3,
+        "max_duration": 15 * 60,
+    },
+}
+
+# check() result for files Dropbox has not finished reading yet.
+PENDING = "pending"
+
+logger = logging.getLogger(__name__)
+
+
+def load_spec():
+    spec = {media_type: dict(limits) for media_type, limits in DEFAULT_SPEC.items()}
+    try:
+        for media_type, limits in json.loads(os.getenv("MEDIA_SPEC") or "{}").items():
+            spec.setdefault(media_type, {}).update(limits)
+    except Exception as e:
+        logger.error(f"Ignoring invalid MEDIA_SPEC: {e}")
+    return spec
+
+
+SPEC = load_spec()
+
+
+def media_info_from_metadata(media_info):
+    """Dropbox MediaInfo -> {"width", "height", "duration"}, {"pending": True}, or {} when it has none."""
+    if media_info is None:
+        return {}
+    if media_info.is_pending():
+        return {"pending": True}
+    md = media_info.get_metadata()
+    info = {}
+    if md.dimensions:
+        info.update(width=md.dimensions.width, height=md.dimensions.height)
+    if getattr(md, "duration", None) is not None:
+        info["duration"] = md.duration / 1000
+    return info
+
+
+def check(media_type, size, info, spec=None):
+    """Why a file cannot be posted, PENDING while its info is not ready, or None when it fits.
+
+    Limits that need info Dropbox does not have are skipped; Instagram still
+    has the final say.
+    """
+    limits = (spec or SPEC).get(media_type, {})
+    if size and "max_bytes" in limits and size > limits["max_bytes"]:
+        return f"{size / 1024 / 1024:.1f}MB is over {limits['max_bytes'] / 1024 / 1024:.0f}MB"
+    if info is None or info.get("pending"):
+        return PENDING
+    width, height = info.get("width"), info.get("height")
+    if width and height:
+        aspect = width / height
+        if not limits.get("min_aspect", 0) <= aspect <= limits.get("max_aspect", float("inf")):
+            return (f"aspect ratio {width}x{height} ({aspect:.2f}) is outside "
+                    f"{limits.get('min_aspect', 0):.2f}–{limits.get('max_aspect', float('inf')):.2f}")
+        if width > limits.get("max_width", float("inf")):
+            return f"width {width}px is over {limits['max_width']}px"
+    duration = info.get("duration")
+    if duration is not None:
+        if duration < limits.get("min_duration", 0):
+            return f"{duration:.1f}s is shorter than {limits['min_duration']}s"
+        if duration > limits.get("max_duration", float("inf")):
+            return f"{duration:.0f}s is longer than {limits['max_duration']}s"
+    return None
+
+
+class MediaInfoCache:
+    """Media info per content_hash, so a file is only ever described once.
+
+    Filled from one files_get_metadata call per file as it comes up for
+    posting; renamed or re-uploaded copies of the same content reuse the entry.
+    """
+
+    def __init__(self, path=MEDIA_INFO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries = self._load()
+
+    def _load(self):
+        if self.path:
+            try:
+                with open(self.path, "r") as f:
+                    entries = json.load(f)
+                # Listings used to store an empty entry for every file (list_folder
+                # returns no media info); look those up again.
+                return {h: info for h, info in entries.items() if set(info) - {"at"}}
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable media info {self.path}: {e}")
+        return {}
+
+    def get(self, content_hash):
+        with self._lock:
+            return self.entries.get(content_hash)
+
+    def put(self, content_hash, info):
+        """Remember info unless it is missing or still pending; call save() to persist."""
+        if not content_hash or info is None or info.get("pending"):
+            return
+        with self._lock:
+            stored = self.entries.get(content_hash)
+            if stored is None or {k: v for k, v in stored.items() if k != "at"} != info:
+                self.entries[content_hash] = dict(info, at=int(time.time()))
+                self._dirty = True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            if len(self.entries) > MEDIA_INFO_MAX_ENTRIES:
+                oldest = sorted(self.entries, key=lambda h: self.entries[h].get("at", 0))
+                for content_hash in oldest[:len(self.entries) - MEDIA_INFO_MAX_ENTRIES]:
+                    del self.entries[content_hash]
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self.entries, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning(f"Could not write media info {self.path}: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_media_info_cache():
+    """One cache per process, shared by every uploader; loaded on first use, off the no-op tick path."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MediaInfoCache()
+        return _cache
@@ -0,0 +1,100 @@
+# post_engine.py
+
+import os
+import sys
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from accounts import load_accounts, load_paused
+from schedule_index import load_schedule
+from instagram_poster import DropboxToInstagramUploader
+from github_secrets import get_github_secrets
+
+# Each due account gets its own worker, so a slow Reels encode on one account
+# never holds up another. Bounded so a busy slot can't exhaust the runner.
+MAX_WORKERS = int(os.getenv("POST_WORKERS", 4))
+
+logger = logging.getLogger("post_engine")
+
+
+def find_due_uploaders(accounts, only=None):
+    """Return (uploader, seconds until slot) for every unpaused account that is due."""
+    schedule = load_schedule()
+    paused = load_paused()
+
+    due = []
+    for name, account in accounts.items():
+        if only and name not in only:
+            continue
+        uploader = DropboxToInstagramUploader(account)
+        if uploader.is_paused(paused):
+            logger.info(f"⏸️ {name} paused, skipping.")
+            continue
+        due_in = uploader.seconds_until_slot(schedule)
+        if due_in is None:
+            logger.info(f"⏰ {name} not in schedule, skipping.")
+            continue
+        due.append((uploader, due_in))
+    return due
+
+
+def run_due_accounts(only=None, max_workers=MAX_WORKERS):
+    accounts = load_accounts()
+    unknown = set(only or []) - set(accounts)
+    if unknown:
+        logger.error(f"Unknown account(s): {', '.join(sorted(unknown))}")
+
+    due = find_due_uploaders(accounts, only)
+    if not due:
+        logger.info("Nothing due this tick.")
+        return {}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(due))) as pool:
+        futures = {
+            pool.submit(uploader.run, due_in): uploader.account.name
+            for uploader, due_in in due
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"❌ {name} run failed: {e}")
+                results[name] = False
+
+    flush_pending_secrets([uploader for uploader, _ in due])
+    return results
+
+
+def flush_pending_secrets(uploaders):
+    """Write every secret the runs queued in one concurrent batch, off the posting path."""
+    pending = {}
+    for uploader in uploaders:
+        pending.update(uploader.pending_secrets)
+    if not pending:
+        return
+    results = get_github_secrets().update_many(pending)
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        logger.warning(f"⚠️ GitHub secret update failed: {', '.join(failed)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post to every Instagram account whose slot is due.")
+    parser.add_argument("--account", action="append", help="Limit the run to this account (repeatable).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()]
+    )
+    results = run_due_accounts(only=args.account)
+    logger.info(f"🏁 Engine finished: {results}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+# post_journal.py
+
+import os
+import json
+import time
+import logging
+
+# Set POST_JOURNAL_DIR="" to keep journals in memory only.
+JOURNAL_DIR = os.getenv("POST_JOURNAL_DIR", os.path.join(".cache", "journal"))
+# Instagram expires unpublished containers after 24 hours.
+CONTAINER_TTL_SECONDS = 24 * 3600
+
+# In pipeline order; "deleted" closes the entry, so it is never stored.
+STAGES = ("link_issued", "container_created", "processing", "published", "deleted")
+
+logger = logging.getLogger(__name__)
+
+
+class PostJournal:
+    """Per-account record of in-flight posts, one entry per Dropbox path.
+
+    Each stage is written before the next network call, so a run that times
+    out or is killed leaves enough behind for the next one to carry on: an
+    existing container is re-polled or published instead of re-created, and a
+    published post only needs its source removed.
+    """
+
+    def __init__(self, account, state_dir=JOURNAL_DIR):
+        self.account = account
+        self.path = os.path.join(state_dir, f"{account}.json") if state_dir else None
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f).get("entries", {})
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable post journal {self.path}: {e}")
+            return
+        now = time.time()
+        expired = [path for path, entry in self.entries.items()
+                   if entry["stage"] != "published" and now - entry["started_at"] > CONTAINER_TTL_SECONDS]
+        for path in expired:
+            del self.entries[path]
+        if expired:
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"entries": self.entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write post journal {self.path}: {e}")
+
+    def get(self, path_lower):
+        return self.entries.get(path_lower)
+
+    def record(self, file, stage, **fields):
+        """Move file's entry to stage, merging fields (e.g. creation_id)."""
+        if stage == "deleted":
+            self.remove(file.path_lower)
+            return
+        now = time.time()
+        entry = self.entries.setdefault(file.path_lower, {
+            "name": file.name,
+            "media_type": file.media_type,
+            "started_at": now,
+        })
+        entry.update(fields, stage=stage, updated_at=now)
+        self._save()
+
+    def remove(self, path_lower):
+        if self.entries.pop(path_lower, None) is not None:
+            self._save()
+
+    def with_container(self):
+        """Paths whose container exists but is not yet published, furthest along first."""
+        pending = [(path, entry) for path, entry in self.entries.items()
+                   if entry.get("creation_id") and entry["stage"] != "published"]
+        pending.sort(key=lambda kv: (-STAGES.index(kv[1]["stage"]), kv[1]["started_at"]))
+        return [path for path, _ in pending]
+
+    def published(self):
+        """{path_lower: entry} for posts that are live but whose source is still in Dropbox."""
+        return {path: entry for path, entry in self.entries.items() if entry["stage"] == "published"}
+
+    def prune(self, live_paths):
+        """Forget unpublished entries whose file is no longer queued."""
+        gone = [path for path, entry in self.entries.items()
+                if entry["stage"] != "published" and path not in live_paths]
+        for path in gone:
+            del self.entries[path]
+        if gone:
+            self._save()
+        return len(gone)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,129 @@
+# posted_index.py
+
+import os
+import struct
+import logging
+import threading
+
+# Set POSTED_INDEX_DIR="" to keep indexes in memory only.
+INDEX_DIR = os.getenv("POSTED_INDEX_DIR", os.path.join(".cache", "posted"))
+# Bloom filter sizing: ~1% false positives at this many bits per hash, 7 probes.
+BLOOM_BITS_PER_ENTRY = 10
+BLOOM_PROBES = 7
+MIN_BLOOM_BITS = 8 * 1024
+
+# Dropbox content_hash is a hex SHA-256.
+DIGEST_SIZE = 32
+MAGIC = b"PIX1"
+HEADER = struct.Struct(">4sII")  # magic, bloom size in bytes, entry count
+
+logger = logging.getLogger(__name__)
+
+
+def _probes(digest, bits):
+    # Content hashes are already uniform, so their own bytes serve as the k hashes.
+    for i in range(BLOOM_PROBES):
+        yield int.from_bytes(digest[i * 4:i * 4 + 4], "big") % bits
+
+
+class PostedIndex:
+    """Per-account set of content hashes that have been published.
+
+    Stored compactly as a sorted array of 32-byte digests behind a Bloom
+    filter: a hash that was never posted (nearly every lookup) is rejected in
+    O(1) without touching the array, and the rare Bloom hit is confirmed with
+    a binary search, so there are no false positives.
+    """
+
+    def __init__(self, account, state_dir=INDEX_DIR):
+        self.account = account
+        self.path = os.path.join(state_dir, f"{account}.idx") if state_dir else None
+        self._digests = b""
+        self._bloom = bytearray(MIN_BLOOM_BITS // 8)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            magic, bloom_size, count = HEADER.unpack_from(data)
+            if magic != MAGIC or len(data) != HEADER.size + bloom_size + count * DIGEST_SIZE:
+                raise ValueError("bad header")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable posted index {self.path}: {e}")
+            return
+        self._bloom = bytearray(data[HEADER.size:HEADER.size + bloom_size])
+        self._digests = data[HEADER.size + bloom_size:]
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, len(self._bloom), len(self)))
+                f.write(self._bloom)
+                f.write(self._digests)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write posted index {self.path}: {e}")
+
+    def _bloom_add(self, digest):
+        bits = len(self._bloom) * 8
+        for bit in _probes(digest, bits):
+            self._bloom[bit >> 3] |= 1 << (bit & 7)
+
+    def _bloom_may_contain(self, digest):
+        bits = len(self._bloom) * 8
+        return all(self._bloom[bit >> 3] & (1 << (bit & 7)) for bit in _probes(digest, bits))
+
+    def _search(self, digest):
+        """Insertion point of digest in the sorted array."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digests[mid * DIGEST_SIZE:(mid + 1) * DIGEST_SIZE] < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _found(self, digest, index):
+        return self._digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE] == digest
+
+    def __contains__(self, content_hash):
+        if not content_hash:
+            return False
+        digest = bytes.fromhex(content_hash)
+        with self._lock:
+            if not self._bloom_may_contain(digest):
+                return False
+            return self._found(digest, self._search(digest))
+
+    def add(self, content_hash):
+        if not content_hash:
+            return
+        digest = bytes.fromhex(content_hash)
+        with self._lock:
+            index = self._search(digest)
+            if self._found(digest, index):
+                return
+            offset = index * DIGEST_SIZE
+            self._digests = self._digests[:offset] + digest + self._digests[offset:]
+            if len(self) * BLOOM_BITS_PER_ENTRY > len(self._bloom) * 8:
+                # Past the sized capacity the false-positive rate climbs; double and refill.
+                self._bloom = bytearray(len(self._bloom) * 2)
+                for i in range(len(self)):
+                    self._bloom_add(self._digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE])
+            else:
+                self._bloom_add(digest)
+            self._save()
+
+    def __len__(self):
+        return len(self._digests) // DIGEST_SIZE
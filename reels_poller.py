@@ -0,0 +1,152 @@
+# reels_poller.py
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import http_client
+from graph_usage import usage_tracker, MAX_THROTTLE_SECONDS
+
+INSTAGRAM_API_BASE = "https://graph.facebook.com/v18.0"
+
+# The job is killed at 14 minutes; stop polling early enough to publish and report.
+RUN_BUDGET_SECONDS = int(os.getenv("RUN_BUDGET_SECONDS", 13 * 60))
+PUBLISH_RESERVE_SECONDS = 30
+# Longest any single container may take, regardless of the remaining budget.
+REELS_MAX_WAIT_SECONDS = int(os.getenv("REELS_MAX_WAIT_SECONDS", 600))
+
+INITIAL_DELAY = 2.0
+BACKOFF_FACTOR = 1.6
+MAX_DELAY = 30.0
+JITTER = 0.25
+
+DONE_STATUSES = {"FINISHED", "PUBLISHED"}
+FAILED_STATUSES = {"ERROR", "EXPIRED"}
+# Given up after this many status requests in a row fail or carry no status_code
+# (expired token, unknown container, outage); POLL_FAILED carries the error.
+MAX_CONSECUTIVE_ERRORS = 3
+POLL_FAILED = "POLL_FAILED"
+
+_PROCESS_STARTED = time.monotonic()
+
+logger = logging.getLogger(__name__)
+
+
+def runner_deadline():
+    """Monotonic time after which no more polling fits in this run."""
+    if not RUN_BUDGET_SECONDS:
+        return float("inf")
+    return _PROCESS_STARTED + RUN_BUDGET_SECONDS - PUBLISH_RESERVE_SECONDS
+
+
+def disable_run_budget():
+    """For long-lived processes, where process start says nothing about a deadline."""
+    global RUN_BUDGET_SECONDS
+    RUN_BUDGET_SECONDS = 0
+
+
+class PollResult:
+    def __init__(self, status, polls, elapsed, error=None):
+        self.status = status
+        self.polls = polls
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def finished(self):
+        return self.status in DONE_STATUSES
+
+    def __repr__(self):
+        return f"PollResult({self.status!r}, polls={self.polls}, elapsed={self.elapsed:.1f}s)"
+
+
+def _fetch_status(creation_id, access_token, account=None):
+    res = http_client.get(
+        f"{INSTAGRAM_API_BASE}/{creation_id}",
+        params={"fields": "status_code,status", "access_token": access_token}
+    )
+    if account:
+        usage_tracker.observe(account, res.headers)
+    try:
+        body = res.json()
+    except ValueError:
+        return None, f"HTTP {res.status_code}: {res.text[:200]}"
+    error = body.get("error")
+    if error:
+        return None, f"{error.get('message', 'unknown error')} (code {error.get('code', 'N/A')})"
+    # status carries Graph's reason for an ERROR status_code, when it gives one.
+    return body.get("status_code"), body.get("status")
+
+
+async def poll_container(creation_id, access_token, deadline, account=None):
+    """Poll one container with jittered exponential backoff until done, failed or out of time.
+
+    deadline is a time.monotonic() value. The first poll comes INITIAL_DELAY
+    in, since a fresh container is never ready at once. Returns a PollResult
+    whose status is the last status_code seen, TIMEOUT, or POLL_FAILED after
+    MAX_CONSECUTIVE_ERRORS unusable responses. With account, polls are spaced
+    out further while its Graph usage is high.
+    """
+    started = time.monotonic()
+    delay = INITIAL_DELAY
+    polls = 0
+    errors = 0
+    status = None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return PollResult("TIMEOUT", polls, time.monotonic() - started)
+        sleep_for = min(delay * random.uniform(1 - JITTER, 1 + JITTER), MAX_DELAY)
+        if account:
+            # The container already exists; near the limit poll slowly rather than not at all.
+            sleep_for = max(sleep_for, min(usage_tracker.delay_for(account), MAX_THROTTLE_SECONDS))
+        await asyncio.sleep(min(sleep_for, remaining))
+        delay = min(delay * BACKOFF_FACTOR, MAX_DELAY)
+
+        detail = None
+        try:
+            status, detail = await asyncio.to_thread(_fetch_status, creation_id, access_token, account)
+        except Exception as e:
+            status, detail = None, str(e)
+        polls += 1
+        if status in DONE_STATUSES or status in FAILED_STATUSES:
+            return PollResult(status, polls, time.monotonic() - started, error=detail)
+        if status is None:
+            errors += 1
+            logger.warning(f"Status poll for {creation_id} failed ({errors}/{MAX_CONSECUTIVE_ERRORS}): {detail}")
+            if errors >= MAX_CONSECUTIVE_ERRORS:
+                return PollResult(POLL_FAILED, polls, time.monotonic() - started, error=detail)
+        else:
+            errors = 0
+
+
+class ContainerPoller:
+    """One event loop, on a daemon thread, shared by every uploader in the process.
+
+    Uploaders run on worker threads; each hands its container to the shared
+    loop and blocks on the result, so containers from all accounts are polled
+    concurrently without a thread per sleeping poll.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="reels-poller", daemon=True).start()
+            return self._loop
+
+    def wait(self, creation_id, access_token, max_wait=REELS_MAX_WAIT_SECONDS, account=None):
+        deadline = min(time.monotonic() + max_wait, runner_deadline())
+        future = asyncio.run_coroutine_threadsafe(
+            poll_container(creation_id, access_token, deadline, account), self._ensure_loop()
+        )
+        return future.result()
+
+
+container_poller = ContainerPoller()
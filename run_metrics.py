@@ -0,0 +1,213 @@
+# run_metrics.py
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+import http_client
+from activity_log import ActivityLog
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(".cache", "metrics"))
+RUNS_LOG_PATH = os.path.join(METRICS_DIR, "runs.jsonl")
+PROM_PATH = os.path.join(METRICS_DIR, "poster.prom")
+# Rotated like the bot activity log; enough history for weeks of p50/p95.
+RUNS_LOG_MAX_BYTES = 4 * 1024 * 1024
+
+# Short labels for the audit message, in pipeline order.
+STAGE_LABELS = {
+    "token_refresh": "token",
+    "list_folder": "list",
+    "temporary_link": "link",
+    "create_container": "create",
+    "reels_poll": "poll",
+    "throttle": "throttle",
+    "wait_for_slot": "wait",
+    "media_publish": "publish",
+    "delete": "delete",
+}
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _active_spans():
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+def _count_request(request):
+    spans = _active_spans()
+    if spans:
+        spans[-1]["requests"] += 1
+
+
+http_client.add_request_listener(_count_request)
+
+
+class RunTrace:
+    """Timing spans for one uploader run.
+
+    span() times a stage and counts the HTTP requests made from the same
+    thread while it is open (innermost span wins). Work done on other threads,
+    like Reels polling, is added with record().
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self.spans = []
+
+    @contextmanager
+    def span(self, stage):
+        span = {"stage": stage, "seconds": 0.0, "requests": 0, "ok": True}
+        stack = _active_spans()
+        stack.append(span)
+        started = time.monotonic()
+        try:
+            yield span
+        except Exception:
+            span["ok"] = False
+            raise
+        finally:
+            span["seconds"] = round(time.monotonic() - started, 4)
+            stack.pop()
+            self.spans.append(span)
+
+    def record(self, stage, seconds, requests=0, ok=True):
+        self.spans.append({"stage": stage, "seconds": round(seconds, 4), "requests": requests, "ok": ok})
+
+    def totals(self):
+        """{stage: (seconds, requests, ok)} summed over repeated spans (e.g. a retried file)."""
+        totals = {}
+        for span in self.spans:
+            seconds, requests, ok = totals.get(span["stage"], (0.0, 0, True))
+            totals[span["stage"]] = (seconds + span["seconds"], requests + span["requests"], ok and span["ok"])
+        return totals
+
+    def summary(self):
+        """One line for the Telegram audit message."""
+        totals = self.totals()
+        parts = []
+        for stage in list(STAGE_LABELS) + sorted(set(totals) - set(STAGE_LABELS)):
+            if stage not in totals:
+                continue
+            seconds, requests, ok = totals[stage]
+            part = f"{STAGE_LABELS.get(stage, stage)} {seconds:.2f}s"
+            if requests:
+                part += f" ({requests} req)"
+            if not ok:
+                part += " ❌"
+            parts.append(part)
+        return "⏱ " + " · ".join(parts) if parts else "⏱ no stages ran"
+
+    def to_record(self, outcome):
+        return {
+            "account": self.account,
+            "started_at": self.started_at,
+            "seconds": round(time.monotonic() - self._started, 4),
+            "outcome": outcome,
+            "stages": {
+                stage: {"seconds": round(seconds, 4), "requests": requests, "ok": ok}
+                for stage, (seconds, requests, ok) in self.totals().items()
+            },
+        }
+
+
+_runs_log = None
+_write_lock = threading.Lock()
+
+
+def runs_log():
+    global _runs_log
+    if _runs_log is None:
+        _runs_log = ActivityLog(path=RUNS_LOG_PATH, archive_dir=os.path.join(METRICS_DIR, "archive"),
+                                max_bytes=RUNS_LOG_MAX_BYTES)
+    return _runs_log
+
+
+def _render_prom(records):
+    latest = {}
+    for record in records:
+        latest[record["account"]] = record
+    lines = [
+        "# HELP poster_run_duration_seconds Wall time of the last run per account.",
+        "# TYPE poster_run_duration_seconds gauge",
+    ]
+    lines += [f'poster_run_duration_seconds{{account="{a}"}} {r["seconds"]}' for a, r in sorted(latest.items())]
+    lines += [
+        "# HELP poster_run_posted Whether the last run per account published a post.",
+        "# TYPE poster_run_posted gauge",
+    ]
+    lines += [f'poster_run_posted{{account="{a}"}} {int(r["outcome"] == "posted")}' for a, r in sorted(latest.items())]
+    lines += [
+        "# HELP poster_last_run_timestamp_seconds Start of the last run per account.",
+        "# TYPE poster_last_run_timestamp_seconds gauge",
+    ]
+    lines += [f'poster_last_run_timestamp_seconds{{account="{a}"}} {r["started_at"]:.0f}' for a, r in sorted(latest.items())]
+    for metric, field, help_text in (
+        ("poster_stage_duration_seconds", "seconds", "Seconds spent in each stage of the last run."),
+        ("poster_stage_requests", "requests", "HTTP requests made by each stage of the last run."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        for account, record in sorted(latest.items()):
+            for stage, values in sorted(record["stages"].items()):
+                lines.append(f'{metric}{{account="{account}",stage="{stage}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def publish(trace, outcome):
+    """Append the run to runs.jsonl and rewrite the Prometheus textfile."""
+    try:
+        with _write_lock:
+            log = runs_log()
+            log.append(trace.to_record(outcome))
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            tmp_path = f"{PROM_PATH}.tmp"
+            with open(tmp_path, "w") as f:
+                # Last record per account among recent runs.
+                f.write(_render_prom(log.tail(200)))
+            os.replace(tmp_path, PROM_PATH)
+    except Exception as e:
+        logger.warning(f"Could not write run metrics: {e}")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(int(round(q * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="p50/p95 per stage from recent run records.")
+    parser.add_argument("--runs", type=int, default=500, help="How many recent runs to include.")
+    parser.add_argument("--account", help="Only this account.")
+    args = parser.parse_args(argv)
+
+    records = [r for r in runs_log().tail(args.runs) if not args.account or r["account"] == args.account]
+    if not records:
+        print("No run records yet.")
+        return 0
+    by_stage = {}
+    for record in records:
+        for stage, values in record["stages"].items():
+            by_stage.setdefault(stage, []).append(values["seconds"])
+    by_stage["(run)"] = [r["seconds"] for r in records]
+
+    print(f"{len(records)} runs")
+    print(f"{'stage':<18}{'n':>6}{'p50':>10}{'p95':>10}")
+    for stage, values in sorted(by_stage.items()):
+        print(f"{stage:<18}{len(values):>6}{percentile(values, 0.5):>9.2f}s{percentile(values, 0.95):>9.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
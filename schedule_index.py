@@ -0,0 +1,109 @@
+# schedule_index.py
+
+import os
+import json
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pytz import timezone, utc
+
+from accounts import CONFIG_PATH
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SECONDS_PER_DAY = 24 * 60 * 60
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+# Slot strings in config.json are wall-clock times in this zone.
+SCHEDULE_TZ = timezone(os.getenv("SCHEDULE_TZ", "Asia/Kolkata"))
+
+logger = logging.getLogger(__name__)
+
+
+def _second_of_week(moment):
+    return moment.weekday() * SECONDS_PER_DAY + moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+def _parse_slot(day, slot):
+    hour, minute = (int(part) for part in slot.split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(slot)
+    return WEEKDAYS.index(day) * SECONDS_PER_DAY + hour * 3600 + minute * 60
+
+
+class CompiledSchedule:
+    """Every account's weekly slots as one sorted array of second-of-week offsets.
+
+    Lookups are a bisect plus at most one wrap-around into next week, so the
+    answer for "Sunday 23:55" correctly finds Monday's first slot.
+    """
+
+    def __init__(self, config):
+        self.slots = {}
+        for account, days in config.items():
+            seconds = set()
+            for day, times in (days or {}).items():
+                if day not in WEEKDAYS:
+                    logger.warning(f"Ignoring unknown day {day!r} for {account}")
+                    continue
+                for slot in times:
+                    try:
+                        seconds.add(_parse_slot(day, slot))
+                    except ValueError:
+                        logger.warning(f"Ignoring invalid slot {slot!r} on {day} for {account}")
+            self.slots[account] = sorted(seconds)
+
+    def _now(self, now=None):
+        return (now or datetime.now(utc)).astimezone(SCHEDULE_TZ)
+
+    def _first_at_or_after(self, slots, target):
+        """Absolute second-of-week (may exceed one week) of the first slot >= target."""
+        base = target - target % SECONDS_PER_WEEK
+        i = bisect_left(slots, target % SECONDS_PER_WEEK)
+        if i < len(slots):
+            return base + slots[i]
+        return base + SECONDS_PER_WEEK + slots[0]
+
+    def slot_within(self, account, earliest, latest, now=None):
+        """Seconds from now to the first slot in [now+earliest, now+latest], or None."""
+        slots = self.slots.get(account)
+        if not slots:
+            return None
+        position = _second_of_week(self._now(now))
+        delta = self._first_at_or_after(slots, position + earliest) - position
+        return delta if delta <= latest else None
+
+    def next_slot(self, account, now=None):
+        """The next slot strictly after now as an aware datetime, or None."""
+        slots = self.slots.get(account)
+        if not slots:
+            return None
+        now = self._now(now).replace(microsecond=0)
+        position = _second_of_week(now)
+        i = bisect_right(slots, position)
+        target = slots[i] if i < len(slots) else slots[0] + SECONDS_PER_WEEK
+        return SCHEDULE_TZ.normalize(now + timedelta(seconds=target - position))
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_schedule(path=CONFIG_PATH):
+    """Compiled schedule for path, recompiled only when the file's mtime or size changes."""
+    try:
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return CompiledSchedule({})
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+    with open(path, "r") as f:
+        compiled = CompiledSchedule(json.load(f))
+    with _cache_lock:
+        _cache[path] = (key, compiled)
+    return compiled
@@ -0,0 +1,152 @@
+# scheduler_daemon.py
+
+import os
+import sys
+import time
+import heapq
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pytz import utc
+
+from accounts import load_accounts, load_paused
+from schedule_index import load_schedule
+from instagram_poster import DropboxToInstagramUploader
+from post_engine import MAX_WORKERS, flush_pending_secrets
+from reels_poller import disable_run_budget
+
+# Fire this long before each slot so the run can pre-stage the container
+# and publish exactly on time (see PRESTAGE_CONTAINERS).
+LEAD_SECONDS = int(os.getenv("DAEMON_LEAD_SECONDS", 300))
+# How often to re-check config.json (and optionally git pull) between fires.
+RELOAD_INTERVAL = int(os.getenv("DAEMON_RELOAD_SECONDS", 60))
+# A slot we woke up for more than this late is reported as missed, not posted.
+LATE_TOLERANCE_SECONDS = 120
+GIT_PULL = os.getenv("SCHEDULER_GIT_PULL", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("scheduler_daemon")
+
+
+class SlotScheduler:
+    """Long-running replacement for the cron tick: one timer queue for every account.
+
+    The queue holds (slot time, account) pairs ordered by slot; the daemon
+    sleeps until the earliest fire time (slot minus LEAD_SECONDS), hands that
+    account to a worker, and queues the account's following slot.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, lead=LEAD_SECONDS):
+        self.lead = lead
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.stop_event = threading.Event()
+        self.timers = []
+        self.schedule = None
+        self.accounts = {}
+        # Last slot handled (fired or reported missed) per account, so a rebuild
+        # inside the lead window never queues that slot a second time.
+        self.handled = {}
+
+    def _rebuild(self, now):
+        self.schedule = load_schedule()
+        self.accounts = load_accounts()
+        self.timers = []
+        # A slot that started moments ago (e.g. across a restart) still fires.
+        start = now - timedelta(seconds=LATE_TOLERANCE_SECONDS)
+        for name in self.accounts:
+            handled = self.handled.get(name)
+            slot = self.schedule.next_slot(name, max(start, handled) if handled else start)
+            if slot:
+                heapq.heappush(self.timers, (slot.astimezone(utc), name))
+        upcoming = ", ".join(f"{name} {slot:%a %H:%M}Z" for slot, name in sorted(self.timers))
+        logger.info(f"📅 Timer queue rebuilt: {upcoming or 'empty'}")
+
+    def _maybe_reload(self, now):
+        if GIT_PULL:
+            try:
+                subprocess.run(["git", "pull", "--ff-only", "--quiet"], check=True, timeout=60)
+            except Exception as e:
+                logger.warning(f"git pull failed: {e}")
+        # load_schedule() returns the same object until config.json changes.
+        if load_schedule() is not self.schedule:
+            self._rebuild(now)
+
+    def _run_account(self, name, slot):
+        account = self.accounts.get(name)
+        if account is None:
+            return
+        if load_paused().get(name):
+            logger.info(f"⏸️ {name} paused, skipping {slot:%H:%M}Z.")
+            return
+        uploader = DropboxToInstagramUploader(account)
+        due_in = int((slot - datetime.now(utc)).total_seconds())
+        try:
+            uploader.run(due_in)
+        except Exception as e:
+            logger.error(f"❌ {name} run failed: {e}")
+        finally:
+            flush_pending_secrets([uploader])
+
+    def _fire_due(self, now):
+        while self.timers and self.timers[0][0] - timedelta(seconds=self.lead) <= now:
+            slot, name = heapq.heappop(self.timers)
+            self.handled[name] = slot
+            late = (now - slot).total_seconds()
+            if late > LATE_TOLERANCE_SECONDS:
+                logger.warning(f"⚠️ Missed {name} slot {slot:%a %H:%M}Z by {late:.0f}s")
+            else:
+                logger.info(f"🔔 {name}: slot {slot:%a %H:%M}Z")
+                self.pool.submit(self._run_account, name, slot)
+            following = self.schedule.next_slot(name, slot)
+            if following:
+                heapq.heappush(self.timers, (following.astimezone(utc), name))
+
+    def run_forever(self):
+        self._rebuild(datetime.now(utc))
+        next_reload = time.monotonic() + RELOAD_INTERVAL
+        while not self.stop_event.is_set():
+            now = datetime.now(utc)
+            self._fire_due(now)
+
+            if time.monotonic() >= next_reload:
+                self._maybe_reload(now)
+                next_reload = time.monotonic() + RELOAD_INTERVAL
+
+            wait = RELOAD_INTERVAL
+            if self.timers:
+                fire_at = self.timers[0][0] - timedelta(seconds=self.lead)
+                wait = min(wait, max((fire_at - datetime.now(utc)).total_seconds(), 0))
+            self.stop_event.wait(wait)
+
+        logger.info("Stopping; waiting for in-flight posts to finish.")
+        self.pool.shutdown(wait=True)
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the posting schedule as a long-lived process.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Accounts posted concurrently.")
+    parser.add_argument("--lead", type=int, default=LEAD_SECONDS, help="Seconds before a slot to start staging.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler()]
+    )
+    # There is no job timeout to race here; only REELS_MAX_WAIT_SECONDS applies.
+    disable_run_budget()
+    scheduler = SlotScheduler(max_workers=args.workers, lead=args.lead)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
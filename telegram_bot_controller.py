@@ -2,19 +2,33 @@
 # telegram_bot_controller.py
 
 import os
+import copy
 import json
 import logging
+import threading
+from contextlib import contextmanager
 import requests
+import http_client
 import dropbox
-import base64
-from datetime import datetime, timedelta
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ParseMode
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import (
     Updater, CommandHandler, CallbackContext, CallbackQueryHandler,
     MessageHandler, Filters
 )
-from nacl import encoding, public  # for GitHub secret encryption
-import asyncio
+from token_cache import dropbox_tokens
+from github_secrets import get_github_secrets
+from github_sync import get_scheduler_sync, get_activity_sync
+from activity_log import ActivityLog
+from handler_pool import offloaded, handler_pool, BOT_WORKERS
+from schedule_index import load_schedule, SCHEDULE_TZ
+from dropbox_sync import get_folder_sync
+from accounts import ACCOUNT_OVERRIDES, DUPLICATES_FOLDER, FAILED_FOLDER
+from media_queue import MediaQueue, DEFAULT_POLICY
+from inventory import Inventory, describe_age
+from deletion_queue import DeletionQueue
+from graph_usage import UsageTracker
 
 # ----------- SETUP LOGGING ----------- #
 logging.basicConfig(
@@ -23,6 +37,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ACCOUNTS = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
+
 # ----------- FILE PATHS ----------- #
 SCHEDULER_DIR = "scheduler"
 CONFIG_PATH = os.path.join(SCHEDULER_DIR, "config.json")
@@ -31,9 +47,9 @@ PAUSED_PATH = os.path.join(SCHEDULER_DIR, "paused.json")
 EXPIRY_PATH = os.path.join(SCHEDULER_DIR, "token_expiry.json")
 RESULTS_PATH = os.path.join(SCHEDULER_DIR, "post_results.json")
 BANNED_PATH = os.path.join(SCHEDULER_DIR, "banned.json")
+INVENTORY_REFRESH_SECONDS = int(os.getenv("INVENTORY_REFRESH", 300))
 MESSAGE_DELETE_DELAY = 1800  # 30 minutes in seconds
-LOG_DIR = "logs"
-LOG_FILE = os.path.join(LOG_DIR, "bot_logs.json")
+DELETION_SWEEP_SECONDS = 60
 
 # ----------- SECURITY SETTINGS ----------- #
 GITHUB_SECRET_NAME = "TELEGRAM_BOT_PASSWORD"
@@ -46,72 +62,85 @@ def ensure_file(file_path, default):
         with open(file_path, 'w') as f:
             json.dump(default, f, indent=2)
 
-def load_json(path):
-    ensure_file(path, {})
-    with open(path, 'r') as f:
-        return json.load(f)
-
-def save_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
-    push_scheduler_file_to_github(os.path.basename(path))
+class StateStore:
+    """Parsed scheduler JSON kept in memory for the life of the bot.
 
-# ----------- SYNC TO GITHUB ----------- #
-def push_scheduler_file_to_github(file_name):
-    try:
-        github_token = os.getenv("GH_PAT")
-        repo = os.getenv("GITHUB_REPOSITORY")
-        file_path = f"{SCHEDULER_DIR}/{file_name}"
-        url = f"https://api.github.com/repos/{repo}/contents/{file_path}"
-        
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github+json"
-        }
+    Each read is one os.stat(): the cached copy is reused until the file's
+    mtime or size changes (e.g. a git pull or the poster touched it). Saves
+    write through to disk and refresh the cache, so a handler never parses
+    a file it just wrote. Callers get their own copy to mutate.
+    """
 
-        with open(file_path, "rb") as f:
-            content = base64.b64encode(f.read()).decode("utf-8")
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.RLock()
 
-        sha = get_existing_file_sha(url, headers)
-        data = {
-            "message": f"Update {file_path} via Telegram bot",
-            "content": content,
-            "branch": "main"
-        }
-        if sha:
-            data["sha"] = sha
-
-        res = requests.put(url, headers=headers, json=data)
-        if res.status_code in [200, 201]:
-            logger.info(f"Successfully pushed {file_name} to GitHub")
-            return True
-        else:
-            logger.error(f"GitHub push failed for {file_name}: {res.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Error pushing to GitHub: {str(e)}")
-        return False
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
 
-def get_existing_file_sha(url, headers):
-    try:
-        res = requests.get(url, headers=headers)
-        if res.status_code == 200:
-            return res.json().get("sha")
-        return None
-    except Exception as e:
-        logger.error(f"Error getting file SHA: {str(e)}")
-        return None
+    def load(self, path, default=None):
+        default = {} if default is None else default
+        with self._lock:
+            try:
+                key = self._stat_key(path)
+            except FileNotFoundError:
+                ensure_file(path, default)
+                key = self._stat_key(path)
+            cached = self._cache.get(path)
+            if cached is None or cached[0] != key:
+                with open(path, 'r') as f:
+                    cached = self._cache[path] = (key, json.load(f))
+            return copy.deepcopy(cached[1])
+
+    def save(self, path, data):
+        with self._lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, path)
+            self._cache[path] = (self._stat_key(path), copy.deepcopy(data))
+        # Coalesced with other saves into a single commit after a short quiet period.
+        get_scheduler_sync().mark_dirty(path)
+
+    @contextmanager
+    def modify(self, path, default=None):
+        """Read-modify-write under the store lock; saved when the block exits cleanly."""
+        with self._lock:
+            data = self.load(path, default)
+            yield data
+            self.save(path, data)
+
+    def config(self):
+        return self.load(CONFIG_PATH)
+
+    def captions(self):
+        return self.load(CAPTIONS_PATH)
+
+    def paused(self):
+        return self.load(PAUSED_PATH)
+
+    def token_expiry(self):
+        return self.load(EXPIRY_PATH)
+
+    def post_results(self):
+        return self.load(RESULTS_PATH)
+
+    def banned(self):
+        return self.load(BANNED_PATH, [])
+
+state = StateStore()
 
 # ----------- SECURITY HELPERS ----------- #
 def is_banned(user_id):
-    banned = load_json(BANNED_PATH)
-    return str(user_id) in banned
+    return str(user_id) in state.banned()
 
 def ban_user(user_id):
-    banned = load_json(BANNED_PATH)
-    if str(user_id) not in banned:
+    if is_banned(user_id):
+        return
+    with state.modify(BANNED_PATH, []) as banned:
         banned.append(str(user_id))
-        save_json(BANNED_PATH, banned)
 
 def is_authorized(user_id):
     return str(user_id) in AUTHORIZED_USERS
@@ -188,23 +217,11 @@ def get_dropbox_access_token(account):
         return None
 
     try:
-        response = requests.post(
-            "https://api.dropbox.com/oauth2/token",
-            data={
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token,
-                "client_id": app_key,
-                "client_secret": app_secret
-            }
-        )
-        response.raise_for_status()
-        token = response.json().get("access_token")
-        if token:
+        # Cached until shortly before expiry, so repeated status taps reuse one token.
+        token, refreshed = dropbox_tokens.get_or_refresh(account, app_key, app_secret, refresh_token)
+        if refreshed:
             logger.info(f"Successfully obtained Dropbox token for {account}")
-            return token
-        else:
-            logger.error(f"No access token in response for {account}")
-            return None
+        return token
     except requests.exceptions.RequestException as e:
         logger.error(f"Dropbox token refresh error for {account}: {str(e)}")
         return None
@@ -217,59 +234,62 @@ def get_dropbox_client(account):
     if not token:
         logger.error(f"Dropbox access token failed for {account}")
         return None
-    return dropbox.Dropbox(oauth2_access_token=token)
+    return dropbox.Dropbox(
+        oauth2_access_token=token,
+        session=http_client.dropbox_session(),
+        timeout=http_client.READ_TIMEOUT
+    )
 
-def count_files_recursive(dbx, folder):
-    count = 0
-    try:
-        result = dbx.files_list_folder(folder, recursive=True)
-        while True:
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FileMetadata):
-                    count += 1
-            if not result.has_more:
-                break
-            result = dbx.files_list_folder_continue(result.cursor)
-    except Exception as e:
-        logger.error(f"Error listing Dropbox files: {e}")
-    return count
-
-def get_remaining_files(account):
-    try:
-        dbx = get_dropbox_client(account)
-        if not dbx:
-            return 0
-        
-        # Count files in the main account folder and all subfolders
-        main_folder = f"/{account}"
-        count = count_files_recursive(dbx, main_folder)
-        
-        logger.info(f"Found {count} files in {main_folder} and subfolders")
-        return count
-    except Exception as e:
-        logger.error(f"Dropbox error for {account}: {str(e)}")
-        return 0
+def count_files_recursive(dbx, account, folder):
+    # Applies list_folder_continue deltas to a cached manifest instead of
+    # walking the whole tree on every refresh.
+    folder_sync = get_folder_sync(dbx, account, folder, recursive=True)
+    entries = folder_sync.sync()
+    # Duplicates and failed files are set aside, not waiting to be posted.
+    set_aside = tuple(f"{folder.rstrip('/')}/{subfolder}/".lower() for subfolder in (DUPLICATES_FOLDER, FAILED_FOLDER))
+    return sum(1 for path in entries if not path.startswith(set_aside))
+
+def fetch_remaining_files(account):
+    """Count files in the account folder and all subfolders; raises on failure."""
+    dbx = get_dropbox_client(account)
+    if not dbx:
+        raise Exception("no Dropbox access token")
+    main_folder = ACCOUNT_OVERRIDES.get(account, {}).get("folder", f"/{account}")
+    return count_files_recursive(dbx, account, main_folder)
+
+# Login, status and the low-files check all read this instead of listing Dropbox.
+inventory = Inventory(fetch_remaining_files)
+
+def describe_inventory(account):
+    snapshot = inventory.get(account)
+    if not snapshot or snapshot.count is None:
+        return "error checking files"
+    text = f"{snapshot.count} files ({describe_age(inventory.age(snapshot))})"
+    if snapshot.error:
+        text += " ⚠️ refresh failed"
+    return text
+
+def refresh_inventory(context: CallbackContext):
+    inventory.refresh(ACCOUNTS)
 
 def check_low_files(account, context):
     try:
-        count = get_remaining_files(account)
-        if count < 5:
-            message = f"⚠️ Only {count} files remaining in /{account} Dropbox folder"
+        snapshot = inventory.get(account)
+        if snapshot and snapshot.count is not None and snapshot.count < 5:
+            message = f"⚠️ Only {snapshot.count} files remaining in /{account} Dropbox folder"
             context.bot.send_message(chat_id=os.getenv("TELEGRAM_CHAT_ID"), text=message)
-        return count
+        return snapshot.count if snapshot else 0
     except Exception as e:
         logger.error(f"Error checking low files for {account}: {str(e)}")
         return 0
 
 # ----------- TOKEN EXPIRY HELPERS ----------- #
 def update_token_expiry(account, expiry_date):
-    exp = load_json(EXPIRY_PATH)
-    exp[account] = expiry_date
-    save_json(EXPIRY_PATH, exp)
+    with state.modify(EXPIRY_PATH) as exp:
+        exp[account] = expiry_date
 
 def check_token_expiry(account, context):
-    exp = load_json(EXPIRY_PATH)
-    expiry = exp.get(account)
+    expiry = state.token_expiry().get(account)
     if not expiry:
         return
     
@@ -282,14 +302,13 @@ def check_token_expiry(account, context):
 
 # ----------- POST RESULT TRACKING ----------- #
 def save_post_result(account, filename, success, error=None):
-    results = load_json(RESULTS_PATH)
-    results[account] = {
-        "last_post": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "filename": filename,
-        "success": success,
-        "error": error
-    }
-    save_json(RESULTS_PATH, results)
+    with state.modify(RESULTS_PATH) as results:
+        results[account] = {
+            "last_post": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "filename": filename,
+            "success": success,
+            "error": error
+        }
 
 # ----------- TELEGRAM HANDLERS ----------- #
 def start(update: Update, context: CallbackContext):
@@ -340,16 +359,12 @@ def handle_password(update: Update, context: CallbackContext):
             logger.info(f"User {user_id} authenticated")
             send_audit_log(context, f"User {user_id} successfully logged in")
 
-            accounts = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
             status_text = "📊 Initial Status:\n\n"
 
-            for account in accounts:
-                try:
-                    files = get_remaining_files(account)
-                    status_text += f"{account}: {files} files in Dropbox\n"
-                except Exception as e:
-                    logger.error(f"Error for {account}: {e}")
-                    status_text += f"{account}: error checking files\n"
+            # One concurrent fetch for whichever accounts aren't cached yet.
+            inventory.get_many(ACCOUNTS)
+            for account in ACCOUNTS:
+                status_text += f"{account}: {describe_inventory(account)}\n"
 
             update.message.reply_text(status_text)
             show_accounts(update, context)
@@ -365,7 +380,7 @@ def handle_password(update: Update, context: CallbackContext):
 @require_auth
 def show_accounts(update: Update, context: CallbackContext):
     try:
-        accounts = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
+        accounts = ACCOUNTS
         buttons = [[InlineKeyboardButton(acc, callback_data=f"account:{acc}")] for acc in accounts]
         reply_markup = InlineKeyboardMarkup(buttons)
         
@@ -382,7 +397,7 @@ def show_accounts(update: Update, context: CallbackContext):
 
 def handle_back_to_accounts(update: Update, context: CallbackContext):
     query = update.callback_query
-    accounts = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
+    accounts = ACCOUNTS
     buttons = [[InlineKeyboardButton(acc, callback_data=f"account:{acc}")] for acc in accounts]
     reply_markup = InlineKeyboardMarkup(buttons)
     query.message.edit_text("Choose an account:", reply_markup=reply_markup)
@@ -409,6 +424,7 @@ def handle_account_selection(update: Update, context: CallbackContext):
             [InlineKeyboardButton("⏸️ Pause/Resume", callback_data="pause")],
             [InlineKeyboardButton("📊 Status Summary", callback_data="status")],
             [InlineKeyboardButton("📤 Post Logs", callback_data="post_logs")],
+            [InlineKeyboardButton("🗂 Upcoming Queue", callback_data="view_queue")],
             [InlineKeyboardButton("📝 View Bot Logs", callback_data="view_logs")],
             [InlineKeyboardButton("♻ Reset Schedule", callback_data="reset")],
             [InlineKeyboardButton("🔙 Back to Accounts", callback_data="back_to_accounts")]
@@ -431,7 +447,7 @@ def handle_account_selection(update: Update, context: CallbackContext):
 def handle_view_schedule(update: Update, context: CallbackContext):
     query = update.callback_query
     account = context.user_data['account']
-    cfg = load_json(CONFIG_PATH)
+    cfg = state.config()
     
     # Create buttons for each day
     buttons = []
@@ -457,7 +473,7 @@ def handle_view_day(update: Update, context: CallbackContext):
     query = update.callback_query
     day = query.data.split(":")[1]
     account = context.user_data['account']
-    cfg = load_json(CONFIG_PATH)
+    cfg = state.config()
     
     times = cfg.get(account, {}).get(day, [])
     if times:
@@ -485,7 +501,7 @@ def handle_view_day(update: Update, context: CallbackContext):
 def handle_post_logs(update: Update, context: CallbackContext):
     query = update.callback_query
     account = context.user_data['account']
-    results = load_json(RESULTS_PATH)
+    results = state.post_results()
     
     if account not in results:
         text = f"📤 No post logs available for {account}"
@@ -501,6 +517,25 @@ def handle_post_logs(update: Update, context: CallbackContext):
     buttons = [[InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]]
     query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
 
+def handle_view_queue(update: Update, context: CallbackContext):
+    """Show the next files the poster will pick, read from the local queue manifest."""
+    query = update.callback_query
+    account = context.user_data['account']
+    policy = ACCOUNT_OVERRIDES.get(account, {}).get("queue_policy") or DEFAULT_POLICY
+    queue = MediaQueue(account, policy)
+
+    upcoming = queue.upcoming(10)
+    if not upcoming:
+        text = f"🗂 Queue for {account} is empty (or not synced yet)."
+    else:
+        text = f"🗂 Next up for {account} ({len(queue)} queued, {queue.policy}):\n\n"
+        for i, item in enumerate(upcoming, 1):
+            icon = "🎬" if item.media_type == "REELS" else "🖼"
+            text += f"{i}. {icon} {item.name} ({item.size / 1024 / 1024:.1f}MB)\n"
+
+    buttons = [[InlineKeyboardButton("🔙 Back", callback_data="back_to_menu")]]
+    query.message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
+
 def handle_reset(update: Update, context: CallbackContext):
     query = update.callback_query
     account = context.user_data['account']
@@ -517,9 +552,8 @@ def handle_reset(update: Update, context: CallbackContext):
 def handle_confirm_reset(update: Update, context: CallbackContext):
     query = update.callback_query
     account = context.user_data['account']
-    cfg = load_json(CONFIG_PATH)
-    cfg[account] = {}
-    save_json(CONFIG_PATH, cfg)
+    with state.modify(CONFIG_PATH) as cfg:
+        cfg[account] = {}
     
     buttons = [[InlineKeyboardButton("🔙 Back to Menu", callback_data="back_to_menu")]]
     query.message.edit_text(
@@ -587,9 +621,8 @@ def handle_time_selection(update: Update, context: CallbackContext):
                 
             account = context.user_data['account']
             weekday = context.user_data['weekday']
-            cfg = load_json(CONFIG_PATH)
-            cfg.setdefault(account, {})[weekday] = sorted(context.user_data['selected_times'])
-            save_json(CONFIG_PATH, cfg)
+            with state.modify(CONFIG_PATH) as cfg:
+                cfg.setdefault(account, {})[weekday] = sorted(context.user_data['selected_times'])
             
             # Show success message with back button
             buttons = [
@@ -692,9 +725,8 @@ def handle_message(update: Update, context: CallbackContext):
                 update.message.reply_text("❌ Caption too short. Please send a longer caption.")
                 return
                 
-            captions = load_json(CAPTIONS_PATH)
-            captions[account] = text
-            save_json(CAPTIONS_PATH, captions)
+            with state.modify(CAPTIONS_PATH) as captions:
+                captions[account] = text
             send_audit_log(context, f"User {update.effective_user.id} updated caption for {account}")
             update.message.reply_text("✅ Static caption saved.")
             context.user_data.clear()
@@ -927,43 +959,35 @@ def handle_add_time(update: Update, context: CallbackContext):
 
 def handle_pause(update: Update, context: CallbackContext):
     account = context.user_data['account']
-    paused = load_json(PAUSED_PATH)
-    paused[account] = not paused.get(account, False)
-    save_json(PAUSED_PATH, paused)
-    state = "⏸️ Paused" if paused[account] else "▶️ Resumed"
-    update.callback_query.message.reply_text(f"{account} is now {state}")
+    with state.modify(PAUSED_PATH) as paused:
+        paused[account] = not paused.get(account, False)
+    label = "⏸️ Paused" if paused[account] else "▶️ Resumed"
+    update.callback_query.message.reply_text(f"{account} is now {label}")
+
+def describe_next_slot(next_slot):
+    if not next_slot:
+        return None
+    days_ahead = (next_slot.date() - datetime.now(SCHEDULE_TZ).date()).days
+    if days_ahead == 0:
+        return next_slot.strftime("%H:%M")
+    if days_ahead == 1:
+        return f"Tomorrow at {next_slot.strftime('%H:%M')}"
+    return f"{next_slot.strftime('%A')} at {next_slot.strftime('%H:%M')}"
 
 def handle_status(update: Update, context: CallbackContext):
     """Show detailed status for an account."""
     try:
         account = context.user_data['account']
-        cfg = load_json(CONFIG_PATH)
-        exp = load_json(EXPIRY_PATH)
-        caption = load_json(CAPTIONS_PATH)
-        paused = load_json(PAUSED_PATH)
-        results = load_json(RESULTS_PATH)
-
-        # Get Dropbox file count with detailed logging
-        remaining_files = get_remaining_files(account)
-        logger.info(f"Status check for {account}: {remaining_files} files found")
-        
-        # Get next scheduled post time
-        now = datetime.now()
-        today = now.strftime("%A")
-        next_post = None
-        
-        if today in cfg.get(account, {}):
-            times = cfg[account][today]
-            for time in times:
-                post_time = datetime.strptime(time, "%H:%M").time()
-                if post_time > now.time():
-                    next_post = time
-                    break
+        cfg = state.config()
+        exp = state.token_expiry()
+        caption = state.captions()
+        paused = state.paused()
+        results = state.post_results()
+
+        remaining_files = describe_inventory(account)
         
-        if not next_post and today != "Sunday":
-            tomorrow = (now + timedelta(days=1)).strftime("%A")
-            if tomorrow in cfg.get(account, {}):
-                next_post = f"Tomorrow at {cfg[account][tomorrow][0]}"
+        # Get next scheduled post time (wraps past Sunday into next week)
+        next_post = describe_next_slot(load_schedule(CONFIG_PATH).next_slot(account))
 
         status = f"📊 *Status for {account}*\n\n"
         status += f"📦 Dropbox Files: {remaining_files}\n"
@@ -977,6 +1001,8 @@ def handle_status(update: Update, context: CallbackContext):
             status += f"📝 Caption: None\n"
             
         status += f"🔑 Token expires: {exp.get(account, 'Unknown')}\n"
+        # Re-read each tap: the posting runs write it, not the bot.
+        status += f"📈 Graph API headroom: {UsageTracker().describe(account)}\n"
         
         if next_post:
             status += f"⏰ Next post: {next_post}\n"
@@ -1052,10 +1078,10 @@ def periodic_checks(context: CallbackContext):
         logger.info("Skipping periodic check: no authorized users")
         return
         
-    accounts = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
-    for account in accounts:
+    for account in ACCOUNTS:
         try:
             check_token_expiry(account, context)
+            check_low_files(account, context)
         except Exception as e:
             logger.error(f"Error during periodic check for {account}: {e}")
 
@@ -1086,49 +1112,8 @@ def handle_change_password(update: Update, context: CallbackContext):
 def update_github_secret(secret_name, secret_value):
     """Update a GitHub secret using the GitHub API."""
     try:
-        repo = os.getenv("GITHUB_REPOSITORY")
-        token = os.getenv("GH_PAT")
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github+json"
-        }
-
-        # Get the public key
-        key_url = f"https://api.github.com/repos/{repo}/actions/secrets/public-key"
-        key_res = requests.get(key_url, headers=headers)
-        
-        if key_res.status_code != 200:
-            logger.error(f"Failed to get public key: {key_res.text}")
-            return False
-            
-        key_data = key_res.json()
-        key_id = key_data.get("key_id")
-        key = key_data.get("key")
-
-        if not key_id or not key:
-            logger.error("GitHub public key missing")
-            return False
-
-        # Encrypt the secret
-        pub_key = public.PublicKey(key.encode(), encoding.Base64Encoder())
-        sealed_box = public.SealedBox(pub_key)
-        encrypted = sealed_box.encrypt(secret_value.encode())
-        encrypted_value = encoding.Base64Encoder().encode(encrypted).decode()
-
-        # Update the secret
-        update_url = f"https://api.github.com/repos/{repo}/actions/secrets/{secret_name}"
-        res = requests.put(update_url, headers=headers, json={
-            "encrypted_value": encrypted_value,
-            "key_id": key_id
-        })
-
-        if res.status_code in [201, 204]:
-            logger.info(f"Successfully updated secret {secret_name}")
-            return True
-        else:
-            logger.error(f"Failed to update secret {secret_name}: {res.text}")
-            return False
-            
+        # Public key is cached with ETag revalidation; unchanged values are skipped.
+        return get_github_secrets().update(secret_name, secret_value)
     except Exception as e:
         logger.error(f"GitHub secret update failed: {e}")
         return False
@@ -1177,6 +1162,7 @@ def handle_back_to_menu(update: Update, context: CallbackContext):
             [InlineKeyboardButton("⏸️ Pause/Resume", callback_data="pause")],
             [InlineKeyboardButton("📊 Status Summary", callback_data="status")],
             [InlineKeyboardButton("📤 Post Logs", callback_data="post_logs")],
+            [InlineKeyboardButton("🗂 Upcoming Queue", callback_data="view_queue")],
             [InlineKeyboardButton("📝 View Bot Logs", callback_data="view_logs")],
             [InlineKeyboardButton("♻ Reset Schedule", callback_data="reset")],
             [InlineKeyboardButton("🔙 Back to Accounts", callback_data="back_to_accounts")]
@@ -1190,44 +1176,44 @@ def handle_back_to_menu(update: Update, context: CallbackContext):
         logger.error(f"Error in handle_back_to_menu: {str(e)}")
         query.message.reply_text("❌ An error occurred. Please try again.")
 
-def ensure_log_file():
-    """Ensure log file exists."""
-    os.makedirs(LOG_DIR, exist_ok=True)
-    if not os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'w') as f:
-            json.dump([], f)
+# Appends one line per entry; pushed to GitHub in batches by get_activity_sync().
+activity_log = ActivityLog(on_write=lambda path: get_activity_sync().mark_dirty(path))
 
 def log_message(message_data):
-    """Log message to file and GitHub."""
+    """Log message to the activity log."""
     try:
-        ensure_log_file()
-        with open(LOG_FILE, 'r') as f:
-            logs = json.load(f)
-        
-        logs.append({
-            "timestamp": datetime.now().isoformat(),
+        activity_log.append({
             "message_id": message_data.get("message_id"),
             "chat_id": message_data.get("chat_id"),
             "text": message_data.get("text"),
             "user_id": message_data.get("user_id"),
             "action": message_data.get("action")
         })
-        
-        with open(LOG_FILE, 'w') as f:
-            json.dump(logs, f, indent=2)
-            
-        # Push to GitHub
-        push_scheduler_file_to_github("logs/bot_logs.json")
     except Exception as e:
         logger.error(f"Error logging message: {str(e)}")
 
-async def delete_message_later(context, chat_id, message_id):
-    """Delete message after delay."""
+# Survives restarts via scheduler/pending_deletions.json. It changes with every
+# bot reply, so it is written locally and only pushed once, at shutdown.
+deletion_queue = DeletionQueue()
+
+def delete_message(bot, chat_id, message_id):
+    """Delete one message; False means try again on a later sweep."""
     try:
-        await asyncio.sleep(MESSAGE_DELETE_DELAY)
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception as e:
-        logger.error(f"Error deleting message: {str(e)}")
+        bot.delete_message(chat_id=chat_id, message_id=message_id)
+        return True
+    except BadRequest as e:
+        # Already deleted, too old, or otherwise never going to work.
+        logger.info(f"Dropping deletion of {chat_id}/{message_id}: {e}")
+        return True
+    except TelegramError as e:
+        logger.warning(f"Deleting {chat_id}/{message_id} failed, will retry: {e}")
+        return False
+
+def sweep_deletions(context: CallbackContext):
+    """Delete every self-destructing message that is due, in one pass."""
+    removed = deletion_queue.sweep(lambda chat_id, message_id: delete_message(context.bot, chat_id, message_id))
+    if removed:
+        logger.info(f"🧹 Deleted {removed} expired messages ({len(deletion_queue)} pending)")
 
 def send_self_destructing_message(update, context, text, reply_markup=None):
     """Send message that will self-destruct after delay."""
@@ -1254,8 +1240,8 @@ def send_self_destructing_message(update, context, text, reply_markup=None):
             "action": "message_sent"
         })
         
-        # Schedule deletion
-        asyncio.create_task(delete_message_later(context, message.chat_id, message.message_id))
+        # Picked up by sweep_deletions once due
+        deletion_queue.schedule(message.chat_id, message.message_id, MESSAGE_DELETE_DELAY)
         
         return message
     except Exception as e:
@@ -1265,11 +1251,8 @@ def send_self_destructing_message(update, context, text, reply_markup=None):
 def handle_view_logs(update: Update, context: CallbackContext):
     """Handle viewing bot logs."""
     try:
-        ensure_log_file()
-        with open(LOG_FILE, 'r') as f:
-            logs = json.load(f)
-            
-        if not logs:
+        recent_logs = activity_log.tail(10)
+        if not recent_logs:
             send_self_destructing_message(
                 update,
                 context,
@@ -1277,8 +1260,6 @@ def handle_view_logs(update: Update, context: CallbackContext):
             )
             return
             
-        # Get last 10 logs
-        recent_logs = logs[-10:]
         text = "📝 Recent Bot Activity:\n\n"
         
         for log in recent_logs:
@@ -1323,7 +1304,7 @@ def main():
     print("GH_PAT:", "Set" if os.getenv("GH_PAT") else "Not Set")
     
     # Check Dropbox credentials
-    accounts = ["inkwisps", "ink_wisps", "eclipsed_by_you"]
+    accounts = ACCOUNTS
     account_secrets = {
         "inkwisps": {
             "app_key": "DROPBOX_INKWISPS_APP_KEY",
@@ -1356,47 +1337,66 @@ def main():
     # Ensure scheduler directory exists
     os.makedirs(SCHEDULER_DIR, exist_ok=True)
 
-    updater = Updater(token)
+    updater = Updater(token, base_url=http_client.telegram_base_url(), request_kwargs={
+        "connect_timeout": http_client.CONNECT_TIMEOUT,
+        "read_timeout": http_client.READ_TIMEOUT,
+    })
     dp = updater.dispatcher
 
     # Add periodic checks every 6 hours
     job_queue = updater.job_queue
     job_queue.run_repeating(periodic_checks, interval=21600, first=10)
+    job_queue.run_repeating(sweep_deletions, interval=DELETION_SWEEP_SECONDS, first=5)
+    # Keep Dropbox counts warm so login and status never wait on a listing.
+    job_queue.run_repeating(refresh_inventory, interval=INVENTORY_REFRESH_SECONDS, first=1)
+
+    # Every handler runs on handler_pool (BOT_WORKERS threads) so a slow Dropbox
+    # or GitHub call for one user never blocks another; each user's updates
+    # still run one at a time, in the order they arrived.
+    logger.info(f"Handling updates on {BOT_WORKERS} workers")
+    working = "⏳ Working…"
 
     # Basic handlers
-    dp.add_handler(CommandHandler("start", start))
-    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_password))
+    dp.add_handler(CommandHandler("start", offloaded(start)))
+    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, offloaded(handle_password, ack=working)))
 
     # Protected handlers
-    dp.add_handler(CallbackQueryHandler(handle_account_selection, pattern="^account:"))
-    dp.add_handler(CallbackQueryHandler(handle_schedule, pattern="^schedule$"))
-    dp.add_handler(CallbackQueryHandler(handle_weekday, pattern="^weekday:"))
-    dp.add_handler(CallbackQueryHandler(handle_time_selection, pattern="^time:"))
-    dp.add_handler(CallbackQueryHandler(handle_caption, pattern="^caption$"))
-    dp.add_handler(CallbackQueryHandler(handle_update_token, pattern="^update_token$"))
-    dp.add_handler(CallbackQueryHandler(handle_pause, pattern="^pause$"))
-    dp.add_handler(CallbackQueryHandler(handle_status, pattern="^status$"))
-    dp.add_handler(CallbackQueryHandler(handle_reset, pattern="^reset$"))
-    dp.add_handler(CallbackQueryHandler(handle_token_choice, pattern="^token:"))
-    dp.add_handler(CallbackQueryHandler(handle_token_confirm, pattern="^token:confirm$"))
-    dp.add_handler(CallbackQueryHandler(handle_message, pattern="^message:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_account_selection), pattern="^account:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_schedule), pattern="^schedule$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_weekday), pattern="^weekday:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_time_selection), pattern="^time:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_caption), pattern="^caption$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_update_token), pattern="^update_token$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_pause), pattern="^pause$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_status, ack=working), pattern="^status$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_reset), pattern="^reset$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_token_choice), pattern="^token:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_token_confirm, ack="⏳ Updating secret…"), pattern="^token:confirm$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_message, ack=working), pattern="^message:"))
     
     # Navigation handlers
-    dp.add_handler(CallbackQueryHandler(handle_back_to_accounts, pattern="^back_to_accounts$"))
-    dp.add_handler(CallbackQueryHandler(handle_view_schedule, pattern="^view_schedule$"))
-    dp.add_handler(CallbackQueryHandler(handle_edit_time, pattern="^edit_time:"))
-    dp.add_handler(CallbackQueryHandler(handle_add_time, pattern="^add_time:"))
-    dp.add_handler(CallbackQueryHandler(handle_post_logs, pattern="^post_logs$"))
-    dp.add_handler(CallbackQueryHandler(handle_confirm_reset, pattern="^confirm_reset$"))
-    dp.add_handler(CallbackQueryHandler(handle_back_to_menu, pattern="^back_to_menu$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_back_to_accounts), pattern="^back_to_accounts$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_view_schedule), pattern="^view_schedule$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_edit_time), pattern="^edit_time:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_add_time), pattern="^add_time:"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_post_logs), pattern="^post_logs$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_view_queue), pattern="^view_queue$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_confirm_reset), pattern="^confirm_reset$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_back_to_menu), pattern="^back_to_menu$"))
     
     # Add new handler for logs
-    dp.add_handler(CallbackQueryHandler(handle_view_logs, pattern="^view_logs$"))
+    dp.add_handler(CallbackQueryHandler(offloaded(handle_view_logs), pattern="^view_logs$"))
     
-    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
+    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, offloaded(handle_message, ack=working)))
 
     updater.start_polling()
     updater.idle()
+    handler_pool.shutdown(wait=True)
+    # Don't lose edits made in the last debounce window before shutdown.
+    if deletion_queue.changed:
+        get_scheduler_sync().mark_dirty(deletion_queue.path)
+    get_scheduler_sync().flush()
+    get_activity_sync().flush()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,134 @@
+# token_cache.py
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import http_client
+
+DROPBOX_TOKEN_URL = "https://api.dropbox.com/oauth2/token"
+
+# Tokens stay in memory unless DROPBOX_TOKEN_CACHE names a file to keep them
+# in between runs. Leave it unset on CI: anything under .cache ends up in the
+# Actions cache, which other workflow runs can restore.
+TOKEN_CACHE_PATH = os.getenv("DROPBOX_TOKEN_CACHE", "")
+
+# Treat a token as expired this long before Dropbox does, so a run never
+# starts a listing or upload with a token that dies halfway through.
+EXPIRY_MARGIN_SECONDS = 600
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(refresh_token):
+    # Ties a cached token to the refresh token that minted it, so rotating the
+    # refresh token through the bot invalidates the cache on the next lookup.
+    return hashlib.sha256((refresh_token or "").encode()).hexdigest()[:16]
+
+
+def request_dropbox_token(app_key, app_secret, refresh_token):
+    """Exchange a refresh token for (access_token, expires_in)."""
+    # Safe to repeat: a retried exchange just mints another short-lived token.
+    r = http_client.post(DROPBOX_TOKEN_URL, idempotent=True, data={
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "client_id": app_key,
+        "client_secret": app_secret,
+    })
+    if r.status_code != 200:
+        raise Exception(r.text)
+    body = r.json()
+    token = body.get("access_token")
+    if not token:
+        raise Exception("No access token in Dropbox response")
+    return token, int(body.get("expires_in", 14400))
+
+
+class DropboxTokenCache:
+    """Short-lived Dropbox access tokens keyed by account.
+
+    Tokens live in memory for the life of the process and, only when a path
+    is set, in a small JSON file so the next run can pick them up too.
+    """
+
+    def __init__(self, path=TOKEN_CACHE_PATH, margin=EXPIRY_MARGIN_SECONDS):
+        self.path = path
+        self.margin = margin
+        self._tokens = None
+        self._lock = threading.Lock()
+        self._account_locks = {}
+
+    def _load(self):
+        if self._tokens is not None:
+            return self._tokens
+        self._tokens = {}
+        if self.path:
+            try:
+                with open(self.path, "r") as f:
+                    self._tokens = json.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable token cache {self.path}: {e}")
+        return self._tokens
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._tokens, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write token cache {self.path}: {e}")
+
+    def _account_lock(self, account):
+        with self._lock:
+            return self._account_locks.setdefault(account, threading.Lock())
+
+    def get(self, account, refresh_token=None):
+        """Return a cached token that is still good for at least `margin` seconds."""
+        with self._lock:
+            entry = self._load().get(account)
+        if not entry:
+            return None
+        if refresh_token is not None and entry.get("fingerprint") != _fingerprint(refresh_token):
+            return None
+        if entry.get("expires_at", 0) - self.margin <= time.time():
+            return None
+        return entry.get("access_token")
+
+    def put(self, account, access_token, expires_in, refresh_token=None):
+        with self._lock:
+            self._load()[account] = {
+                "access_token": access_token,
+                "expires_at": int(time.time()) + int(expires_in),
+                "fingerprint": _fingerprint(refresh_token),
+            }
+            self._save()
+
+    def invalidate(self, account):
+        with self._lock:
+            if self._load().pop(account, None) is not None:
+                self._save()
+
+    def get_or_refresh(self, account, app_key, app_secret, refresh_token):
+        """Return (access_token, refreshed); only hits Dropbox when the cache is stale."""
+        # Per-account lock: concurrent callers for one account share a single refresh.
+        with self._account_lock(account):
+            token = self.get(account, refresh_token)
+            if token:
+                return token, False
+            token, expires_in = request_dropbox_token(app_key, app_secret, refresh_token)
+            self.put(account, token, expires_in, refresh_token)
+            logger.info(f"Dropbox token refreshed for {account} (expires in {expires_in}s)")
+            return token, True
+
+
+# Shared by every caller in the process.
+dropbox_tokens = DropboxTokenCache()